@@ -0,0 +1,184 @@
+import time
+import cv2
+import numpy as np
+from frame_buffers import reuse_buffer
+from hand_detector import HandDetector, HandDetections, box_iou
+from metrics import metrics
+
+class AdaptiveStats:
+    """Frames detectados vs. rastreados, CPU economizada e erro do rastreamento"""
+    
+    def __init__(self):
+        self.detected = 0
+        self.tracked = 0
+        self.forced = 0
+        self.detect_time = 0.0
+        self.track_time = 0.0
+        self.checks = 0
+        self.iou_total = 0.0
+        self.count_matches = 0
+    
+    def record_check(self, tracked, detected):
+        """Compara mãos rastreadas com a detecção completa do mesmo frame"""
+        for box, fingers in zip(tracked.boxes, tracked.finger_counts):
+            if not detected.boxes:
+                iou, match = 0.0, None
+            else:
+                ious = [box_iou(box, other) for other in detected.boxes]
+                match = int(np.argmax(ious))
+                iou = ious[match]
+            self.checks += 1
+            self.iou_total += iou
+            if match is not None and detected.finger_counts[match] == fingers:
+                self.count_matches += 1
+    
+    def saved_ms(self):
+        """Tempo de MediaPipe evitado, descontado o custo do rastreamento"""
+        if not self.detected:
+            return 0.0
+        detect_avg = self.detect_time / self.detected
+        return 1000 * (self.tracked * detect_avg - self.track_time)
+    
+    def summary(self):
+        total = self.detected + self.tracked
+        if not total:
+            return "Sem frames"
+        text = (f"Detectados: {self.detected}/{total} ({self.forced} forçados) | "
+                f"CPU economizada: {self.saved_ms() / 1000:.1f}s")
+        if self.checks:
+            text += (f" | IoU rastreio: {self.iou_total / self.checks:.2f}"
+                     f" | Contagem igual: {self.count_matches / self.checks:.0%}")
+        return text
+
+class AdaptiveHandDetector(HandDetector):
+    """Executa o MediaPipe a cada N frames e rastreia os landmarks entre eles
+    
+    Nos frames intermediários os landmarks do frame anterior são propagados com
+    fluxo óptico (Lucas-Kanade). N acompanha o movimento medido das mãos: cresce
+    quando elas estão paradas e cai quando se movem rápido; se o rastreamento
+    perde qualidade a detecção completa é executada imediatamente.
+    """
+    
+    def __init__(self, min_interval=1, max_interval=8, min_tracking_quality=0.7,
+                 max_drift=0.25, **kwargs):
+        super().__init__(**kwargs)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.min_tracking_quality = min_tracking_quality
+        
+        # Deslocamento máximo (fração do tamanho da mão) aceito entre detecções;
+        # N é escolhido para que o movimento medido não passe disso
+        self.max_drift = max_drift
+        
+        self.interval = min_interval
+        self.stats = AdaptiveStats()
+        self._previous = None
+        self._previous_gray = None
+        # Dois buffers de tons de cinza alternados: o do frame atual e o anterior (LK)
+        self._gray_buffers = [None, None]
+        self._gray_index = 0
+        self._frames_since_detection = 0
+        self._lk_params = dict(
+            winSize=(21, 21), maxLevel=3,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        )
+    
+    def detect(self, frame):
+        gray = self._gray(frame)
+        previous = self._previous
+        scheduled = previous is None or self._frames_since_detection + 1 >= self.interval
+        
+        if not scheduled:
+            if len(previous) == 0:
+                # Sem mãos para rastrear: frame vazio até a próxima detecção
+                tracked = HandDetections(frame)
+            else:
+                start = time.perf_counter()
+                tracked, quality, motion = self._track(frame, gray)
+                elapsed = time.perf_counter() - start
+                self.stats.track_time += elapsed
+                metrics.record('tracking', elapsed)
+                
+                if quality < self.min_tracking_quality:
+                    # Rastreamento perdido: detectar imediatamente
+                    tracked = None
+                    self.stats.forced += 1
+                    self.interval = self.min_interval
+                else:
+                    self._adjust_interval(motion)
+            
+            if tracked is not None:
+                self.stats.tracked += 1
+                self._frames_since_detection += 1
+                self._previous, self._previous_gray = tracked, gray
+                return tracked
+        
+        start = time.perf_counter()
+        result = super().detect(frame)
+        self.stats.detect_time += time.perf_counter() - start
+        self.stats.detected += 1
+        
+        if scheduled and previous is not None and len(previous) > 0 and len(result) > 0:
+            # Erro que o rastreamento teria cometido neste frame
+            if self.interval > 1:
+                tracked, _, _ = self._track(frame, gray)
+                self.stats.record_check(tracked, result)
+            
+            # Movimento desde o frame anterior, quando as mesmas mãos continuam no frame
+            if len(previous) == len(result):
+                self._adjust_interval(self._motion(previous, result))
+        
+        self._frames_since_detection = 0
+        self._previous, self._previous_gray = result, gray
+        return result
+    
+    def _gray(self, frame):
+        """Tons de cinza no buffer que não guarda o frame anterior"""
+        index = self._gray_index
+        self._gray_index = 1 - index
+        buffer = reuse_buffer(self._gray_buffers[index], frame.shape[:2])
+        self._gray_buffers[index] = buffer
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=buffer)
+    
+    @staticmethod
+    def _motion(previous, current):
+        """Deslocamento mediano entre frames relativo ao tamanho da mão (pior mão)"""
+        displacement = np.linalg.norm(current.points[:, :, :2] - previous.points[:, :, :2], axis=2)
+        hand_sizes = np.array([max(x2 - x1, y2 - y1, 1) for x1, y1, x2, y2 in previous.boxes])
+        return float((np.median(displacement, axis=1) / hand_sizes).max())
+    
+    def _track(self, frame, gray):
+        """Propaga os landmarks do frame anterior; retorna (resultado, qualidade, movimento)"""
+        previous = self._previous
+        n_hands = len(previous)
+        points = previous.points[:, :, :2].reshape(-1, 1, 2).astype(np.float32)
+        
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._previous_gray, gray, points, None, **self._lk_params)
+        
+        status = status.reshape(n_hands, 21).astype(bool)
+        displacement = (new_points - points).reshape(n_hands, 21, 2)
+        
+        # Pontos perdidos seguem o deslocamento mediano da própria mão
+        moved = np.empty_like(displacement)
+        for hand in range(n_hands):
+            valid = status[hand]
+            median = np.median(displacement[hand][valid], axis=0) if valid.any() else (0, 0)
+            moved[hand] = np.where(valid[:, None], displacement[hand], median)
+        
+        landmarks = previous.landmarks.copy()
+        landmarks[:, :, 0] += moved[:, :, 0] / previous.width
+        landmarks[:, :, 1] += moved[:, :, 1] / previous.height
+        
+        # Qualidade: fração de landmarks rastreados na pior mão
+        quality = status.mean(axis=1).min()
+        
+        tracked = HandDetections(frame, landmarks=landmarks, handedness=previous.handedness)
+        motion = self._motion(previous, tracked)
+        return tracked, quality, motion
+    
+    def _adjust_interval(self, motion):
+        if motion <= 0:
+            self.interval = self.max_interval
+        else:
+            self.interval = int(np.clip(self.max_drift / motion, self.min_interval, self.max_interval))
@@ -0,0 +1,204 @@
+import queue
+import threading
+import time
+from collections import Counter
+import cv2
+import numpy as np
+from feature_extraction import landmark_features
+
+# Lado da imagem usada no hash perceptual (dHash: 8 x 8 comparações = 64 bits)
+HASH_SIZE = 8
+
+def roi_hash(frame, box):
+    """dHash de 64 bits da região da mão: gradiente horizontal de uma miniatura 9 x 8
+    
+    None se a caixa não tiver área dentro do frame.
+    """
+    x1, y1, x2, y2 = (int(c) for c in box)
+    roi = frame[max(y1, 0):y2, max(x1, 0):x2]
+    if roi.size == 0:
+        return None
+    small = cv2.resize(roi, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = gray[:, 1:] > gray[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def annotations(detections):
+    """(caixa, dedos, landmarks, lateralidade) de cada detecção para save_training_frame"""
+    return [(d['box'], d['fingers'], d['points'], d['handedness']) for d in detections]
+
+def hamming(hashes, value):
+    """Bits diferentes entre cada hash do array e value"""
+    bits = np.unpackbits((hashes ^ np.uint64(value)).view(np.uint8))
+    return bits.reshape(len(hashes), 64).sum(axis=1)
+
+class SignatureHistory:
+    """Últimas assinaturas (pose e hash) aceitas de um rótulo, em arrays circulares"""
+    
+    def __init__(self, capacity=2000):
+        self.capacity = capacity
+        self.poses = np.empty((capacity, 63))
+        self.hashes = np.zeros(capacity, dtype=np.uint64)
+        self.has_hash = np.zeros(capacity, dtype=bool)
+        self.count = 0
+        self._next = 0
+    
+    def add(self, pose, image_hash=None):
+        self.poses[self._next] = pose
+        self.has_hash[self._next] = image_hash is not None
+        if image_hash is not None:
+            self.hashes[self._next] = image_hash
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+    
+    def min_pose_distance(self, pose):
+        """Menor distância média por landmark (em comprimentos da palma) até o histórico"""
+        if not self.count:
+            return np.inf
+        diffs = (self.poses[:self.count] - pose).reshape(self.count, 21, 3)
+        return float(np.linalg.norm(diffs, axis=2).mean(axis=1).min())
+    
+    def min_hash_distance(self, image_hash):
+        valid = self.has_hash[:self.count]
+        if not valid.any():
+            return 64
+        return int(hamming(self.hashes[:self.count][valid], image_hash).min())
+
+class CaptureStats:
+    def __init__(self):
+        self.saved = 0
+        self.frames_written = 0
+        self.duplicates = 0
+        self.over_quota = 0
+        self.dropped = 0
+    
+    def summary(self):
+        return (f"Auto: {self.saved} salvas | {self.duplicates} duplicadas | "
+                f"{self.over_quota} acima da cota | {self.dropped} descartadas")
+
+class AutoCapture:
+    """Salva continuamente as mãos detectadas no modo treino
+    
+    - no máximo rate frames por segundo são salvos;
+    - mãos quase iguais a uma já salva do mesmo rótulo são descartadas: pose
+      (landmarks normalizados) a menos de pose_threshold ou hash perceptual da
+      ROI a até hash_threshold bits;
+    - cada rótulo para de receber amostras ao atingir quota (contando o dataset);
+    - a escrita em disco roda em uma thread; se ela atrasar, frames são descartados
+      em vez de travar o vídeo.
+    """
+    
+    def __init__(self, data_handler, rate=2.0, quota=300, pose_threshold=0.05, hash_threshold=4,
+                 history=2000, queue_size=8):
+        self.data_handler = data_handler
+        self.min_interval = 1.0 / rate if rate else 0.0
+        self.quota = quota
+        self.pose_threshold = pose_threshold
+        self.hash_threshold = hash_threshold
+        self.enabled = False
+        self.stats = CaptureStats()
+        
+        # Amostras por rótulo (existentes + aceitas nesta sessão) para as cotas
+        self.counts = Counter({label: data_handler.count_existing_images(label)
+                               for label in range(6)})
+        
+        # Poses já salvas (manifest com landmarks) também contam como duplicatas
+        self.history = {label: SignatureHistory(history) for label in range(6)}
+        for landmarks, handedness, label in data_handler.list_landmark_samples():
+            if label in self.history:
+                self.history[label].add(landmark_features(landmarks, handedness))
+        
+        self._last_save = 0.0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = threading.Thread(target=self._write_loop, name='capture-writer', daemon=True)
+        self._writer.start()
+    
+    def toggle(self):
+        self.enabled = not self.enabled
+        return self.enabled
+    
+    def full(self):
+        return bool(self.quota) and all(self.counts[label] >= self.quota for label in range(6))
+    
+    def _is_duplicate(self, label, pose, image_hash):
+        history = self.history[label]
+        if self.pose_threshold and history.min_pose_distance(pose) < self.pose_threshold:
+            return True
+        if not self.hash_threshold or image_hash is None:
+            return False
+        return history.min_hash_distance(image_hash) <= self.hash_threshold
+    
+    def process(self, frame, detections):
+        """Avalia as detecções do frame; retorna quantas mãos foram enviadas para gravação"""
+        if not self.enabled or not detections:
+            return 0
+        now = time.perf_counter()
+        if now - self._last_save < self.min_interval:
+            return 0
+        # Esta thread é a única que coloca na fila: se há espaço agora, o put abaixo não falha
+        if self._queue.full():
+            self.stats.dropped += len(detections)
+            return 0
+        
+        # Histórico e contagens são atualizados a cada mão aceita: duas mãos quase
+        # iguais no mesmo frame não passam juntas e a cota não é excedida
+        accepted = []
+        for detection in detections:
+            label = detection['fingers']
+            if self.quota and self.counts[label] >= self.quota:
+                self.stats.over_quota += 1
+                continue
+            
+            pose = landmark_features(detection['points'], detection['handedness'])
+            image_hash = roi_hash(frame, detection['box'])
+            if self._is_duplicate(label, pose, image_hash):
+                self.stats.duplicates += 1
+                continue
+            self._accept(label, pose, image_hash)
+            accepted.append(detection)
+        
+        if not accepted:
+            return 0
+        
+        # Cópia do frame: o buffer da câmera é reaproveitado na próxima leitura
+        self._queue.put_nowait((frame.copy(), annotations(accepted)))
+        
+        self._last_save = now
+        self.stats.saved += len(accepted)
+        return len(accepted)
+    
+    def save_manual(self, frame, detections, source='mediapipe'):
+        """Salva as mãos capturadas pelo usuário (ESPAÇO/M) e as registra nas cotas e no histórico
+        
+        A gravação é imediata e não passa pelos filtros: a captura manual é
+        intencional, mas a automática passa a considerá-la nas cotas e duplicatas.
+        """
+        self.data_handler.save_training_frame(frame, annotations(detections), source=source)
+        for detection in detections:
+            pose = landmark_features(detection['points'], detection['handedness'])
+            self._accept(detection['fingers'], pose, roi_hash(frame, detection['box']))
+        return len(detections)
+    
+    def _accept(self, label, pose, image_hash):
+        self.counts[label] += 1
+        self.history[label].add(pose, image_hash)
+    
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, annotations = item
+            try:
+                self.data_handler.save_training_frame(frame, annotations, source='auto')
+                self.stats.frames_written += 1
+            except Exception as e:
+                print(f"Erro ao salvar captura automática: {e}")
+    
+    def quota_summary(self):
+        return " ".join(f"{label}:{self.counts[label]}/{self.quota or '-'}" for label in range(6))
+    
+    def close(self):
+        """Grava o que estiver na fila e encerra a thread de escrita"""
+        self._queue.put(None)
+        self._writer.join()
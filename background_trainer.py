@@ -0,0 +1,68 @@
+import threading
+import time
+from model_trainer import ModelTrainer
+
+class BackgroundTrainer:
+    """Treina um novo ModelTrainer em uma thread sem bloquear o vídeo
+    
+    O modelo atual continua em uso até o novo estar ajustado e salvo; então
+    on_trained(novo_trainer) é chamado para substituí-lo.
+    """
+    
+    def __init__(self, dataset_path, on_trained, trainer_factory=ModelTrainer):
+        self.dataset_path = dataset_path
+        self.on_trained = on_trained
+        self.trainer_factory = trainer_factory
+        
+        self.stage = None
+        self.fraction = 0.0
+        self.started_at = None
+        self.last_result = None
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Inicia o treino; retorna False se já houver um em andamento"""
+        with self._lock:
+            if self.running:
+                return False
+            self.stage = "Iniciando"
+            self.fraction = 0.0
+            self.started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name='training', daemon=True)
+            self._thread.start()
+            return True
+    
+    def _progress(self, stage, fraction):
+        self.stage = stage
+        self.fraction = fraction
+    
+    def _run(self):
+        try:
+            trainer = self.trainer_factory()
+            result = trainer.train(self.dataset_path, progress=self._progress)
+        except Exception as e:
+            print(f"Erro no treino em segundo plano: {e}")
+            result = None
+        
+        elapsed = time.perf_counter() - self.started_at
+        if result:
+            self.on_trained(result)
+            self.last_result = f"Modelo atualizado em {elapsed:.1f}s"
+        else:
+            self.last_result = "Falha no treino; modelo anterior mantido"
+        print(self.last_result)
+        self.stage = None
+    
+    def status(self):
+        """Texto para o overlay: progresso atual ou resultado do último treino"""
+        if self.running and self.stage:
+            elapsed = time.perf_counter() - self.started_at
+            if self.fraction is None:
+                return f"Treinando: {self.stage} ({elapsed:.0f}s)"
+            return f"Treinando: {self.stage} {self.fraction:.0%} ({elapsed:.0f}s)"
+        return self.last_result
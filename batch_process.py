@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Processamento em lote (sem janela) de vídeos e diretórios de imagens
+
+Cada trecho de vídeo, ou bloco de imagens de um diretório, é processado por um
+processo separado com seu próprio HandDetector e classificador (ModelTrainer ou,
+com --compact, o artefato compacto sem scikit-learn). O resultado é um JSONL com
+uma linha por frame: caixas, contagens e confianças de cada mão. Os blocos são
+gravados na ordem de entrada assim que ficam prontos, de modo que a memória não
+cresce com a duração do vídeo e uma interrupção preserva o que já foi gravado.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+import cv2
+from hand_detector import HandDetector
+from model_backends import FEATURE_MODES
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp'}
+
+def collect_jobs(inputs, chunk_size=64, video_chunk=300):
+    """Lista de (tipo, origem, caminhos, frames): trechos de video_chunk frames por vídeo,
+    blocos de imagens por diretório
+    
+    frames é o intervalo (início, fim) do trecho de vídeo; fim None lê até o final.
+    """
+    jobs = []
+    for entry in inputs:
+        path = Path(entry)
+        if path.is_dir():
+            images = sorted(p for p in path.rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+            for i in range(0, len(images), chunk_size):
+                jobs.append(('images', str(path), [str(p) for p in images[i:i + chunk_size]], None))
+        elif path.suffix.lower() in IMAGE_EXTENSIONS:
+            jobs.append(('images', str(path.parent), [str(path)], None))
+        elif path.is_file():
+            cap = cv2.VideoCapture(str(path))
+            n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            # O número de frames do contêiner é uma estimativa: o último trecho vai até o fim
+            starts = list(range(0, max(n_frames, 1), video_chunk))
+            for start, stop in zip(starts, starts[1:] + [None]):
+                jobs.append(('video', str(path), [str(path)], (start, stop)))
+        else:
+            print(f"Entrada ignorada (não encontrada): {entry}")
+    return jobs
+
+def frame_record(source, frame_id, result, classifier):
+    """Linha do JSONL para um frame"""
+    hands = []
+    if len(result):
+        if classifier is not None:
+            predictions = result.predictions(classifier)
+        else:
+            predictions = [(None, 0)] * len(result)
+        for box, handedness, landmark_fingers, (fingers, confidence) in zip(
+                result.boxes, result.handedness, result.finger_counts, predictions):
+            hands.append({
+                'box': [int(v) for v in box],
+                'handedness': handedness,
+                'fingers': None if fingers is None else int(fingers),
+                'confidence': round(float(confidence), 4),
+                'landmark_fingers': int(landmark_fingers)
+            })
+    return {'source': source, 'frame': frame_id, 'hands': hands}
+
+def _iter_frames(kind, source, paths, frames=None):
+    """Gera (id do frame, imagem BGR) de um trecho de vídeo ou de uma lista de imagens de source"""
+    if kind == 'video':
+        start, stop = frames or (0, None)
+        cap = cv2.VideoCapture(paths[0])
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            # Contêiner sem busca exata: decodifica desde o início até o trecho
+            if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start:
+                cap.release()
+                cap = cv2.VideoCapture(paths[0])
+                for _ in range(start):
+                    if not cap.grab():
+                        break
+        frame_id = start
+        try:
+            while stop is None or frame_id < stop:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield frame_id, frame
+                frame_id += 1
+        finally:
+            cap.release()
+        return
+    
+    root = Path(source)
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            print(f"Erro ao ler {path}")
+            continue
+        # Caminho relativo ao diretório de entrada: nomes iguais em subdiretórios não colidem
+        yield Path(path).relative_to(root).as_posix(), frame
+
+def model_file(feature_mode='hog', compact=False):
+    """Arquivo (ou diretório, no compacto) do modelo salvo para o modo de features"""
+    suffix = "" if feature_mode == 'hog' else f"_{feature_mode}"
+    return f"hand_model{suffix}_compact" if compact else f"hand_model{suffix}.pkl"
+
+def load_classifier(feature_mode='hog', compact=False):
+    """Classificador com predict_batch; None se não houver modelo salvo"""
+    if compact:
+        from compact_model import CompactModel
+        path = model_file(feature_mode, compact)
+        return CompactModel.load(path) if os.path.isdir(path) else None
+    
+    from model_trainer import ModelTrainer
+    model_trainer = ModelTrainer(feature_mode=feature_mode)
+    return model_trainer if model_trainer.load_model() else None
+
+def process_job(job, feature_mode='hog', inference_width=None, compact=False):
+    """Executa detecção + classificação de um job; retorna (origem, linhas JSONL, frames, segundos)"""
+    kind, source, paths, frames = job
+    start = time.perf_counter()
+    
+    # Vídeos mantêm o rastreamento do MediaPipe entre os frames do trecho; imagens são independentes
+    detector = HandDetector(inference_width=inference_width,
+                            static_image_mode=(kind == 'images'))
+    classifier = load_classifier(feature_mode, compact)
+    
+    lines = []
+    for frame_id, frame in _iter_frames(kind, source, paths, frames):
+        result = detector.detect(frame)
+        record = frame_record(source, frame_id, result, classifier)
+        lines.append(json.dumps(record))
+    
+    detector.hands.close()
+    return source, lines, len(lines), time.perf_counter() - start
+
+def _ordered_results(executor, worker, jobs, max_pending):
+    """Resultados na ordem dos jobs, com no máximo max_pending jobs submetidos e não lidos
+    
+    Diferente de executor.map, que submete tudo de uma vez e guarda os resultados
+    prontos até que os anteriores terminem.
+    """
+    jobs = iter(jobs)
+    pending = deque(executor.submit(worker, job) for job in itertools.islice(jobs, max_pending))
+    while pending:
+        result = pending.popleft().result()
+        for job in itertools.islice(jobs, 1):
+            pending.append(executor.submit(worker, job))
+        yield result
+
+def run_batch(inputs, output, n_jobs=None, chunk_size=64, feature_mode='hog',
+              inference_width=None, compact=False, video_chunk=300):
+    jobs = collect_jobs(inputs, chunk_size, video_chunk)
+    if not jobs:
+        print("Nenhum vídeo ou imagem encontrado")
+        return 0
+    
+    # Só verifica se o modelo existe: cada processo carrega o seu
+    if not os.path.exists(model_file(feature_mode, compact)):
+        print("Modelo não encontrado; apenas detecção e contagem por landmarks")
+    
+    worker = partial(process_job, feature_mode=feature_mode, inference_width=inference_width,
+                     compact=compact)
+    n_workers = min(n_jobs or os.cpu_count() or 1, len(jobs))
+    
+    total_frames = 0
+    start = time.perf_counter()
+    with open(output, 'w') as f:
+        if n_workers <= 1:
+            results = map(worker, jobs)
+            executor = None
+        else:
+            # 'spawn': cada processo cria seu próprio MediaPipe
+            context = multiprocessing.get_context('spawn')
+            executor = ProcessPoolExecutor(max_workers=n_workers, mp_context=context)
+            results = _ordered_results(executor, worker, jobs, 2 * n_workers)
+        
+        try:
+            for (kind, _, _, frames_range), (source, lines, frames, elapsed) in zip(jobs, results):
+                for line in lines:
+                    f.write(line + '\n')
+                f.flush()
+                total_frames += frames
+                fps = frames / elapsed if elapsed > 0 else 0.0
+                if kind == 'video' and frames:
+                    first = frames_range[0]
+                    source = f"{source} (frames {first}-{first + frames - 1})"
+                print(f"{source}: {frames} frames em {elapsed:.1f}s ({fps:.1f} FPS)")
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+    
+    elapsed = time.perf_counter() - start
+    print(f"\nTotal: {total_frames} frames de {len(jobs)} jobs em {elapsed:.1f}s "
+          f"({total_frames / elapsed:.1f} FPS, {n_workers} processos)")
+    print(f"Resultados salvos em {output}")
+    return total_frames
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Processa vídeos e diretórios de imagens sem janela")
+    parser.add_argument('inputs', nargs='+', help="arquivos de vídeo, imagens ou diretórios")
+    parser.add_argument('-o', '--output', default='results.jsonl', help="arquivo JSONL de saída")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="processos (padrão: todos os núcleos)")
+    parser.add_argument('--chunk-size', type=int, default=64,
+                        help="imagens por job ao processar diretórios")
+    parser.add_argument('--video-chunk', type=int, default=300,
+                        help="frames por job ao processar vídeos")
+    parser.add_argument('--features', choices=FEATURE_MODES, default='hog')
+    parser.add_argument('--compact', action='store_true',
+                        help="usa o modelo compacto (compact_model.py), sem scikit-learn")
+    parser.add_argument('--inference-width', type=int, default=None,
+                        help="largura máxima do frame enviado ao MediaPipe")
+    args = parser.parse_args()
+    
+    run_batch(args.inputs, args.output, args.jobs, args.chunk_size, args.features,
+              args.inference_width, args.compact, args.video_chunk)
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""Benchmarks dos caminhos críticos da detecção e da classificação
+
+Mede cada etapa do frame separadamente (cvtColor, MediaPipe, landmarks, HOG,
+normalização e SVC) e o custo de carregar/treinar o dataset em vários tamanhos.
+Também mede a memória alocada por frame no caminho de exibição e o pico de RSS.
+Roda offline sobre frames sintéticos ou gravados, grava os resultados em JSON e
+compara com um baseline salvo, apontando regressões.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import cv2
+import numpy as np
+import sklearn
+from mediapipe.framework.formats import landmark_pb2, classification_pb2
+from compact_model import CompactModel
+from data_handler import DataHandler
+from feature_extraction import HOG_PARAMS, extract_roi
+from frame_buffers import copy_into
+from hand_detector import HandDetector
+from model_trainer import ModelTrainer
+from packed_dataset import PackedDataset, packed_path
+
+def synthetic_hands(n_hands, seed=0):
+    """Landmarks e lateralidade sintéticos no formato retornado pelo MediaPipe"""
+    rng = np.random.default_rng(seed)
+    multi_hand_landmarks = []
+    multi_handedness = []
+    
+    for i in range(n_hands):
+        hand_landmarks = landmark_pb2.NormalizedLandmarkList()
+        center = rng.uniform(0.2, 0.8, 2)
+        for x, y, z in rng.uniform(-1, 1, (21, 3)) * (0.08, 0.12, 0.05):
+            landmark = hand_landmarks.landmark.add()
+            landmark.x, landmark.y, landmark.z = center[0] + x, center[1] + y, z
+        multi_hand_landmarks.append(hand_landmarks)
+        
+        handedness = classification_pb2.ClassificationList()
+        classification = handedness.classification.add()
+        classification.label = 'Right' if i % 2 == 0 else 'Left'
+        classification.score = 0.9
+        multi_handedness.append(handedness)
+    
+    return multi_hand_landmarks, multi_handedness
+
+def legacy_process_hands(multi_hand_landmarks, multi_handedness, w, h):
+    """Implementação anterior (laço por mão) mantida como referência"""
+    boxes = []
+    counts = []
+    
+    for hand_idx, hand_landmarks in enumerate(multi_hand_landmarks):
+        x_coords = [lm.x * w for lm in hand_landmarks.landmark]
+        y_coords = [lm.y * h for lm in hand_landmarks.landmark]
+        
+        margin = 30
+        x1 = max(0, int(min(x_coords)) - margin)
+        y1 = max(0, int(min(y_coords)) - margin)
+        x2 = min(w, int(max(x_coords)) + margin)
+        y2 = min(h, int(max(y_coords)) + margin)
+        boxes.append((x1, y1, x2, y2))
+        
+        landmarks = hand_landmarks.landmark
+        is_right_hand = multi_handedness[hand_idx].classification[0].label == 'Right'
+        palm_facing_camera = landmarks[9].z - landmarks[0].z < 0
+        hand_scale = abs(landmarks[0].y - landmarks[12].y)
+        
+        fingers_up = 0
+        if is_right_hand == palm_facing_camera:
+            if landmarks[4].x < landmarks[3].x - 0.02:
+                fingers_up += 1
+        else:
+            if landmarks[4].x > landmarks[3].x + 0.02:
+                fingers_up += 1
+        
+        for tip, dip, pip, mcp in ((8, 7, 6, 5), (12, 11, 10, 9), (16, 15, 14, 13), (20, 19, 18, 17)):
+            tip_y = landmarks[tip].y
+            dip_y = landmarks[dip].y
+            pip_y = landmarks[pip].y
+            mcp_y = landmarks[mcp].y
+            if palm_facing_camera:
+                if tip_y < dip_y - 0.01 and dip_y < pip_y:
+                    fingers_up += 1
+            elif abs(tip_y - mcp_y) > hand_scale * 0.3 and tip_y < pip_y:
+                fingers_up += 1
+        counts.append(fingers_up)
+    
+    return boxes, counts
+
+def vectorized_process_hands(multi_hand_landmarks, multi_handedness, w, h):
+    landmarks = HandDetector._landmarks_array(multi_hand_landmarks)
+    boxes = HandDetector._boxes_from_landmarks(landmarks, w, h)
+    is_right_hand = np.array([hand.classification[0].label == 'Right' for hand in multi_handedness])
+    counts = HandDetector._count_fingers_batch(landmarks, is_right_hand)
+    return boxes, [int(c) for c in counts]
+
+def time_samples(fn, repeats, warmup=1):
+    """Tempo de cada chamada (segundos), após as chamadas de aquecimento"""
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+    return samples
+
+def summarize(samples):
+    samples = np.asarray(samples) * 1000
+    return {
+        'mean_ms': float(samples.mean()),
+        'median_ms': float(np.median(samples)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'repeats': int(len(samples))
+    }
+
+def synthetic_frames(n_frames=8, w=1280, h=720, seed=0):
+    """Frames de ruído suave (sem mãos): custo fixo do pipeline"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(n_frames):
+        small = rng.integers(0, 255, (h // 8, w // 8, 3), dtype=np.uint8)
+        frames.append(cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR))
+    return frames
+
+def load_frames(path, limit=60):
+    """Frames gravados: vídeo ou diretório de imagens"""
+    path = Path(path)
+    frames = []
+    if path.is_dir():
+        for image_path in sorted(path.iterdir())[:limit]:
+            frame = cv2.imread(str(image_path))
+            if frame is not None:
+                frames.append(frame)
+    else:
+        cap = cv2.VideoCapture(str(path))
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    if not frames:
+        raise ValueError(f"Nenhum frame lido de {path}")
+    return frames
+
+def synthetic_dataset(path, n_samples, seed=0):
+    """Dataset sintético com 6 classes (círculos de tamanhos diferentes)"""
+    rng = np.random.default_rng(seed)
+    data_handler = DataHandler(path)
+    for i in range(n_samples):
+        fingers = i % 6
+        image = rng.integers(0, 50, (240, 320, 3), dtype=np.uint8)
+        cv2.circle(image, (100 + fingers * 20, 120), 20 + fingers * 5, (255, 255, 255), -1)
+        data_handler.save_training_image(image, (40, 40, 260, 220), fingers)
+    return data_handler
+
+def quiet_train(trainer, dataset_path):
+    # Os prints do treino poluiriam a tabela de resultados
+    with contextlib.redirect_stdout(io.StringIO()):
+        return trainer.train(dataset_path)
+
+def bench_landmarks(hand_counts=(1, 2, 10), repeats=2000, w=1920, h=1080):
+    """Custo por frame de caixas + contagem de dedos: laço por mão vs. vetorizado
+    
+    Medido para cada quantidade de mãos: com poucas mãos o custo fixo da versão
+    vetorizada pesa mais; a vantagem aparece com muitas mãos por frame.
+    """
+    results = {}
+    for n_hands in hand_counts:
+        multi_hand_landmarks, multi_handedness = synthetic_hands(n_hands)
+        
+        legacy = legacy_process_hands(multi_hand_landmarks, multi_handedness, w, h)
+        vectorized = vectorized_process_hands(multi_hand_landmarks, multi_handedness, w, h)
+        if legacy != vectorized:
+            raise AssertionError(f"Resultados diferentes entre as implementações ({n_hands} mãos)")
+        
+        results[f'landmarks_legacy_{n_hands}h'] = summarize(time_samples(
+            lambda: legacy_process_hands(multi_hand_landmarks, multi_handedness, w, h), repeats))
+        results[f'landmarks_vectorized_{n_hands}h'] = summarize(time_samples(
+            lambda: vectorized_process_hands(multi_hand_landmarks, multi_handedness, w, h), repeats))
+    return results
+
+def bench_stages(frames, workdir, n_hands=2, repeats=500, process_repeats=30):
+    """Custo de cada etapa de um frame com n_hands mãos"""
+    results = {}
+    h, w = frames[0].shape[:2]
+    frame = frames[0]
+    
+    results['cvtColor'] = summarize(time_samples(
+        lambda: cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), repeats))
+    
+    detector = HandDetector()
+    rgb_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+    index = iter(range(10 ** 9))
+    results['hands.process'] = summarize(time_samples(
+        lambda: detector.hands.process(rgb_frames[next(index) % len(rgb_frames)]),
+        process_repeats, warmup=3))
+    detector.hands.close()
+    
+    multi_hand_landmarks, multi_handedness = synthetic_hands(n_hands)
+    landmarks = HandDetector._landmarks_array(multi_hand_landmarks)
+    is_right_hand = np.array([hand.classification[0].label == 'Right' for hand in multi_handedness])
+    boxes = HandDetector._boxes_from_landmarks(landmarks, w, h)
+    
+    results['landmarks_array'] = summarize(time_samples(
+        lambda: HandDetector._landmarks_array(multi_hand_landmarks), repeats))
+    results['boxes'] = summarize(time_samples(
+        lambda: HandDetector._boxes_from_landmarks(landmarks, w, h), repeats))
+    results['count_fingers'] = summarize(time_samples(
+        lambda: HandDetector._count_fingers_batch(landmarks, is_right_hand), repeats))
+    
+    # Modelo real (HOG + SVC) treinado em um dataset sintético pequeno; tipo e HOG
+    # fixos para que os tempos não dependam de configurações ajustadas
+    trainer = ModelTrainer(n_jobs=1, model_type='svc')
+    trainer.hog_params = dict(HOG_PARAMS)
+    trainer.model_path = Path(workdir) / "stage_model.pkl"
+    trainer.scaler_path = Path(workdir) / "stage_scaler.pkl"
+    trainer.compact_path = Path(workdir) / "stage_compact"
+    synthetic_dataset(Path(workdir) / "stage_dataset", 120)
+    quiet_train(trainer, Path(workdir) / "stage_dataset")
+    
+    results['hog'] = summarize(time_samples(
+        lambda: [trainer.extract_features(frame, box) for box in boxes], repeats))
+    features = np.array([trainer.extract_features(frame, box) for box in boxes])
+    scaled = trainer.scaler.transform(features)
+    results['scale'] = summarize(time_samples(
+        lambda: trainer.scaler.transform(features), repeats))
+    results['svc_predict'] = summarize(time_samples(
+        lambda: trainer.model.predict(scaled), repeats))
+    results['svc_predict_proba'] = summarize(time_samples(
+        lambda: trainer.model.predict_proba(scaled), repeats))
+    results['predict_batch'] = summarize(time_samples(
+        lambda: trainer.predict_batch(frame, boxes), repeats))
+    
+    # Artefato compacto (só NumPy) exportado pelo save_model do treino acima
+    compact = CompactModel(trainer.compact_path)
+    results['compact_scores'] = summarize(time_samples(
+        lambda: compact.class_scores(compact.scale(features)), repeats))
+    results['compact_predict_batch'] = summarize(time_samples(
+        lambda: compact.predict_batch(frame, boxes), repeats))
+    return results
+
+def bench_dataset(sizes, workdir, repeats=3):
+    """load_dataset e train (PNGs e compactado, sem e com cache) por tamanho do dataset"""
+    results = {}
+    for n_samples in sizes:
+        dataset_path = Path(workdir) / f"dataset_{n_samples}"
+        data_handler = synthetic_dataset(dataset_path, n_samples)
+        results[f'load_dataset[{n_samples}]'] = summarize(time_samples(
+            data_handler.load_dataset, repeats, warmup=0))
+        
+        trainer = ModelTrainer(model_type='svc')
+        trainer.hog_params = dict(HOG_PARAMS)
+        trainer.model_path = dataset_path / "model.pkl"
+        trainer.scaler_path = dataset_path / "scaler.pkl"
+        trainer.compact_path = dataset_path / "compact"
+        cache_path = trainer._cache_path(dataset_path)
+        
+        def cold_train():
+            shutil.rmtree(cache_path, ignore_errors=True)
+            quiet_train(trainer, dataset_path)
+        
+        results[f'train[{n_samples}]'] = summarize(time_samples(cold_train, 1, warmup=0))
+        results[f'train_cached[{n_samples}]'] = summarize(time_samples(
+            lambda: quiet_train(trainer, dataset_path), 1, warmup=0))
+        
+        # Dataset compactado: empacotar uma vez, depois carregar/treinar sem decodificar PNGs
+        pack = PackedDataset(packed_path(dataset_path))
+        results[f'pack[{n_samples}]'] = summarize(time_samples(
+            lambda: pack.sync(data_handler), 1, warmup=0))
+        results[f'load_packed[{n_samples}]'] = summarize(time_samples(
+            lambda: np.asarray(pack.load()[0]).sum(), repeats, warmup=0))
+        
+        trainer.packed = True
+        packed_cache = trainer._cache_path(pack.path)
+        
+        def cold_packed_train():
+            shutil.rmtree(packed_cache, ignore_errors=True)
+            quiet_train(trainer, dataset_path)
+        
+        results[f'train_packed[{n_samples}]'] = summarize(time_samples(
+            cold_packed_train, 1, warmup=0))
+        
+        # Treino em lotes (SGD) a partir do zero, com memória limitada
+        incremental = ModelTrainer(incremental=True, packed=True)
+        incremental.model_path = dataset_path / "model_sgd.pkl"
+        incremental.scaler_path = dataset_path / "scaler_sgd.pkl"
+        incremental.compact_path = dataset_path / "compact_sgd"
+        
+        def incremental_train():
+            incremental.model_path.unlink(missing_ok=True)
+            quiet_train(incremental, dataset_path)
+        
+        results[f'train_incremental[{n_samples}]'] = summarize(time_samples(
+            incremental_train, 1, warmup=0))
+    return results
+
+def legacy_frame_path(frame, boxes, detector):
+    """Caminho do frame antes dos buffers: cópias e conversões alocadas a cada frame"""
+    display = frame.copy()
+    cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    for box in boxes:
+        extract_roi(frame, box)
+        cv2.rectangle(display, tuple(box[:2]), tuple(box[2:]), (0, 255, 0), 3)
+    return display
+
+def buffered_frame_path(frame, boxes, detector, state):
+    """Mesmo caminho com os buffers reaproveitados de HandDetector, ModelTrainer e main.py"""
+    state['display'] = display = copy_into(state.get('display'), frame)
+    detector._prepare_rgb(frame)
+    for box in boxes:
+        extract_roi(frame, box, buffers=state)
+        cv2.rectangle(display, tuple(box[:2]), tuple(box[2:]), (0, 255, 0), 3)
+    return display
+
+def frame_allocations(fn, frames, repeats):
+    """Média e máximo (KiB) do pico de memória alocada dentro de uma chamada por frame"""
+    peaks = []
+    fn(frames[0])
+    tracemalloc.start()
+    try:
+        for i in range(repeats):
+            frame = frames[i % len(frames)]
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            fn(frame)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    peaks = np.array(peaks) / 1024
+    return {'mean_kib': float(peaks.mean()), 'max_kib': float(peaks.max())}
+
+def bench_memory(frames, n_hands=2, repeats=200):
+    """Alocações por frame (cópia de exibição, RGB, ROIs) e pico de RSS do processo"""
+    h, w = frames[0].shape[:2]
+    multi_hand_landmarks, _ = synthetic_hands(n_hands)
+    landmarks = HandDetector._landmarks_array(multi_hand_landmarks)
+    boxes = [tuple(int(v) for v in box)
+             for box in HandDetector._boxes_from_landmarks(landmarks, w, h)]
+    
+    detector = HandDetector()
+    state = {}
+    results = {
+        'frame_alloc_legacy': frame_allocations(
+            lambda frame: legacy_frame_path(frame, boxes, detector), frames, repeats),
+        'frame_alloc_buffered': frame_allocations(
+            lambda frame: buffered_frame_path(frame, boxes, detector, state), frames, repeats)
+    }
+    detector.hands.close()
+    return results
+
+def peak_rss_mib():
+    # ru_maxrss: KiB no Linux, bytes no macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def environment():
+    import mediapipe
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'sklearn': sklearn.__version__,
+        'mediapipe': mediapipe.__version__
+    }
+
+def compare(results, baseline, threshold):
+    """Lista (etapa, atual, baseline, razão) das etapas com mediana acima do limite"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or previous['median_ms'] <= 0:
+            continue
+        ratio = current['median_ms'] / previous['median_ms']
+        if ratio > 1 + threshold:
+            regressions.append((name, current['median_ms'], previous['median_ms'], ratio))
+    return regressions
+
+def compare_memory(memory, baseline, threshold):
+    """Alocações por frame acima do baseline (o RSS depende demais do ambiente)"""
+    regressions = []
+    for name, current in memory.items():
+        previous = baseline.get(name)
+        if not isinstance(current, dict) or not previous:
+            continue
+        # Folga absoluta: poucos KiB de objetos Python não são regressão
+        limit = previous['mean_kib'] * (1 + threshold) + 4
+        if current['mean_kib'] > limit:
+            regressions.append((name, current['mean_kib'], previous['mean_kib']))
+    return regressions
+
+def print_memory(memory):
+    print(f"\n{'Memória por frame':<28}{'média':>12}{'máx':>12}")
+    for name, summary in memory.items():
+        if isinstance(summary, dict):
+            print(f"{name:<28}{summary['mean_kib']:9.1f}KiB{summary['max_kib']:9.1f}KiB")
+    print(f"Pico de RSS: {memory['peak_rss_mib']:.0f} MiB")
+
+def print_results(results, baseline=None):
+    baseline = baseline or {}
+    print(f"{'Etapa':<28}{'mediana':>12}{'p95':>12}{'baseline':>12}")
+    for name, summary in results.items():
+        previous = baseline.get(name)
+        reference = f"{previous['median_ms']:10.3f}ms" if previous else f"{'-':>12}"
+        print(f"{name:<28}{summary['median_ms']:10.3f}ms{summary['p95_ms']:10.3f}ms{reference}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do sistema de reconhecimento de mãos")
+    parser.add_argument('--hands', type=int, default=2, help="mãos por frame")
+    parser.add_argument('--landmark-hands', default='1,2,10',
+                        help="quantidades de mãos da comparação de landmarks (laço vs. vetorizado)")
+    parser.add_argument('--repeats', type=int, default=500)
+    parser.add_argument('--process-repeats', type=int, default=30,
+                        help="repetições do hands.process (mais caro)")
+    parser.add_argument('--frames', default=None,
+                        help="vídeo ou diretório de imagens gravados (padrão: frames sintéticos)")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--sizes', default='120,480',
+                        help="tamanhos do dataset para load_dataset/train (vazio para pular)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="grava os resultados atuais como novo baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="aumento relativo da mediana considerado regressão")
+    args = parser.parse_args()
+    
+    if args.frames:
+        frames = load_frames(args.frames)
+        source = args.frames
+    else:
+        frames = synthetic_frames(w=args.width, h=args.height)
+        source = 'synthetic'
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    landmark_hands = [int(n) for n in args.landmark_hands.split(',') if n.strip()]
+    
+    results = {}
+    results.update(bench_landmarks(landmark_hands, args.repeats))
+    with tempfile.TemporaryDirectory() as workdir:
+        results.update(bench_stages(frames, workdir, args.hands, args.repeats,
+                                    args.process_repeats))
+        results.update(bench_dataset(sizes, workdir))
+    memory = bench_memory(frames, args.hands)
+    memory['peak_rss_mib'] = peak_rss_mib()
+    
+    report = {
+        'environment': environment(),
+        'config': {
+            'frames': source, 'frame_size': list(frames[0].shape[1::-1]), 'hands': args.hands,
+            'landmark_hands': landmark_hands, 'repeats': args.repeats, 'process_repeats': args.process_repeats, 'sizes': sizes
+        },
+        'results': results,
+        'memory': memory
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    baseline = None
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists() and not args.update_baseline:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        # Tempos só são comparáveis na mesma máquina e com os mesmos parâmetros
+        if baseline.get('config') != report['config']:
+            print("Aviso: baseline gerado com outra configuração")
+        if baseline.get('environment') != report['environment']:
+            print("Aviso: baseline gerado em outro ambiente")
+    
+    print_results(results, baseline['results'] if baseline else None)
+    print_memory(memory)
+    print(f"\nResultados salvos em {args.output}")
+    
+    if args.update_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline atualizado: {baseline_path}")
+    elif baseline:
+        regressions = compare(results, baseline['results'], args.threshold)
+        for name, current, previous, ratio in regressions:
+            print(f"REGRESSÃO {name}: {current:.3f}ms vs {previous:.3f}ms ({ratio:.2f}x)")
+        memory_regressions = compare_memory(memory, baseline.get('memory', {}), args.threshold)
+        for name, current, previous in memory_regressions:
+            print(f"REGRESSÃO {name}: {current:.1f}KiB/frame vs {previous:.1f}KiB/frame")
+        if regressions or memory_regressions:
+            sys.exit(1)
+        print(f"Sem regressões acima de {args.threshold:.0%}")
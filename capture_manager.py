@@ -1,5 +1,9 @@
 import cv2
 import numpy as np
+from frame_buffers import copy_into
+
+# Espessura do retângulo de seleção (define a margem restaurada a cada redesenho)
+SELECTION_THICKNESS = 2
 
 class CaptureManager:
     def __init__(self):
@@ -7,9 +11,39 @@ class CaptureManager:
         self.start_point = None
         self.end_point = None
         self.current_frame = None
+        self._display = None
+        self._drawn = None
+        
+    def _redraw(self):
+        """Atualiza a seleção no buffer de exibição sem copiar o frame inteiro
+        
+        Só a região do retângulo desenhado anteriormente é restaurada a partir
+        do frame original antes de desenhar o novo.
+        """
+        if self._drawn is not None:
+            x1, y1, x2, y2 = self._drawn
+            self._display[y1:y2, x1:x2] = self.current_frame[y1:y2, x1:x2]
+            self._drawn = None
+        
+        if self.start_point and self.end_point:
+            h, w = self._display.shape[:2]
+            margin = SELECTION_THICKNESS + 1
+            self._drawn = (
+                max(min(self.start_point[0], self.end_point[0]) - margin, 0),
+                max(min(self.start_point[1], self.end_point[1]) - margin, 0),
+                min(max(self.start_point[0], self.end_point[0]) + margin + 1, w),
+                min(max(self.start_point[1], self.end_point[1]) + margin + 1, h)
+            )
+            cv2.rectangle(self._display, self.start_point, self.end_point, (0, 0, 255),
+                          SELECTION_THICKNESS)
+        return self._display
         
     def capture_frame(self, frame):
-        self.current_frame = frame.copy()
+        # A seleção é desenhada em um buffer próprio: o frame continua limpo para
+        # ser salvo e não precisa ser copiado
+        self.current_frame = frame
+        self._display = copy_into(self._display, frame)
+        self._drawn = None
         self.selecting = False
         self.start_point = None
         self.end_point = None
@@ -20,13 +54,8 @@ class CaptureManager:
         print("\nClique e arraste para selecionar a mão")
         
         while True:
-            display = self.current_frame.copy()
-            
             # Desenhar retângulo de seleção
-            if self.start_point and self.end_point:
-                cv2.rectangle(display, self.start_point, self.end_point, (0, 0, 255), 2)
-            
-            cv2.imshow('Capture', display)
+            cv2.imshow('Capture', self._redraw())
             
             key = cv2.waitKey(1) & 0xFF
             
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""Artefato compacto do classificador, sem scikit-learn na inferência
+
+export_model grava um diretório com manifest.json (versão do formato, tipo do
+modelo, configuração das features e classes) e um .npy por array: parâmetros
+do StandardScaler e os pesos do classificador (vetores de suporte, pesos
+lineares, componentes Nystroem ou nós das árvores). CompactModel carrega o
+diretório (arrays por memory-map) e reproduz ModelTrainer.predict_batch usando
+apenas NumPy: mesmos rótulos e mesma confiança.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+import cv2
+import numpy as np
+from feature_extraction import extract_hog, landmark_features
+from metrics import metrics
+from model_backends import FEATURE_MODES
+
+FORMAT_VERSION = 1
+
+# Limites usados pelo libsvm nas probabilidades por par de classes
+_MIN_PROB = 1e-7
+
+def _rbf_kernel(X, Y, gamma, Y_sq_norms):
+    """exp(-gamma |x - y|^2); as normas de Y são calculadas uma vez no carregamento"""
+    sq_dist = (X ** 2).sum(axis=1)[:, None] - 2 * X @ Y.T + Y_sq_norms[None, :]
+    return np.exp(-gamma * np.maximum(sq_dist, 0))
+
+def _softmax(scores):
+    if scores.ndim == 1:
+        # Duas classes: uma única margem, positiva para classes_[1]
+        scores = np.column_stack([-scores, scores])
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp_scores = np.exp(scores)
+    return exp_scores / exp_scores.sum(axis=1, keepdims=True)
+
+def _export_svc(svc):
+    if svc.kernel != 'rbf':
+        raise ValueError(f"Kernel não suportado: {svc.kernel}")
+    # Atributos internos do libsvm (sem a inversão de sinal do caso binário)
+    arrays = {
+        'support_vectors': svc.support_vectors_,
+        'dual_coef': svc._dual_coef_,
+        'intercept': svc._intercept_,
+        'n_support': svc.n_support_
+    }
+    params = {'gamma': float(svc._gamma)}
+    if svc.probability:
+        arrays['prob_a'] = svc.probA_
+        arrays['prob_b'] = svc.probB_
+    return arrays, params
+
+def _export_trees(forest):
+    """Nós de todas as árvores concatenados; filhos com índices globais (-1 = folha)"""
+    lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        left = tree.children_left.astype(np.int64)
+        right = tree.children_right.astype(np.int64)
+        lefts.append(np.where(left >= 0, left + offset, -1))
+        rights.append(np.where(right >= 0, right + offset, -1))
+        features.append(tree.feature.astype(np.int64))
+        thresholds.append(tree.threshold)
+        # Proporção de cada classe no nó (predict_proba de uma árvore)
+        value = tree.value[:, 0, :]
+        values.append(value / value.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += tree.node_count
+    arrays = {
+        'children_left': np.concatenate(lefts), 'children_right': np.concatenate(rights),
+        'feature': np.concatenate(features), 'threshold': np.concatenate(thresholds),
+        'value': np.concatenate(values), 'roots': np.array(roots, dtype=np.int64)
+    }
+    return arrays, {}
+
+def _export_estimator(model):
+    """(tipo, arrays, parâmetros) do classificador, identificado pelo nome da classe"""
+    name = type(model).__name__
+    if name == 'SVC':
+        arrays, params = _export_svc(model)
+        return ('svc' if model.probability else 'svc_fast'), arrays, params
+    if name in ('LinearSVC', 'SGDClassifier'):
+        arrays = {'coef': model.coef_, 'intercept': model.intercept_}
+        if name == 'SGDClassifier':
+            if model.loss != 'log_loss':
+                raise ValueError(f"SGDClassifier com loss não suportada: {model.loss}")
+            return 'sgd', arrays, {}
+        return 'linear', arrays, {}
+    if name == 'Pipeline':
+        nystroem, linear = (step for _, step in model.steps)
+        if type(nystroem).__name__ != 'Nystroem' or nystroem.kernel != 'rbf':
+            raise ValueError("Pipeline não suportado (esperado Nystroem RBF + LinearSVC)")
+        arrays = {'components': nystroem.components_, 'normalization': nystroem.normalization_,
+                  'coef': linear.coef_, 'intercept': linear.intercept_}
+        return 'nystroem', arrays, {'gamma': float(nystroem.gamma)}
+    if name == 'ExtraTreesClassifier':
+        arrays, params = _export_trees(model)
+        return 'trees', arrays, params
+    raise ValueError(f"Modelo não suportado para exportação: {name}")
+
+def export_model(trainer, path=None):
+    """Grava o artefato compacto do modelo carregado/treinado em trainer; retorna o caminho"""
+    path = Path(path or trainer.compact_path)
+    model_type, arrays, params = _export_estimator(trainer.model)
+    arrays = {'scaler_mean': trainer.scaler.mean_, 'scaler_scale': trainer.scaler.scale_, **arrays}
+    
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_type': model_type,
+        'feature_mode': trainer.feature_mode,
+        'roi_size': list(trainer.roi_size),
+        'hog_params': {key: list(value) if isinstance(value, tuple) else value
+                       for key, value in trainer.hog_params.items()},
+        'classes': [int(label) for label in trainer.model.classes_],
+        'params': params,
+        'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'arrays': {name: {'shape': list(np.shape(array)), 'dtype': str(np.asarray(array).dtype)}
+                   for name, array in arrays.items()}
+    }
+    
+    # Grava em um diretório temporário e troca no final: leitores nunca veem
+    # um artefato pela metade
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(tmp_path / f"{name}.npy", np.ascontiguousarray(array))
+    with open(tmp_path / "manifest.json", 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    old_path = path.with_name(f"{path.name}.old")
+    shutil.rmtree(old_path, ignore_errors=True)
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+class CompactModel:
+    """Preditor só com NumPy a partir do artefato de export_model
+    
+    Tem a mesma interface de predição do ModelTrainer (model, feature_mode,
+    predict, predict_batch) e pode substituí-lo na detecção e no rastreamento.
+    """
+    
+    def __init__(self, path, mmap=True):
+        self.path = Path(path)
+        with open(self.path / "manifest.json") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Formato do artefato {self.path} não suportado: "
+                             f"{self.manifest.get('format_version')} (esperado {FORMAT_VERSION})")
+        
+        self.model_type = self.manifest['model_type']
+        self.feature_mode = self.manifest['feature_mode']
+        self.roi_size = tuple(self.manifest['roi_size'])
+        self.hog_params = {key: tuple(value) if isinstance(value, list) else value
+                           for key, value in self.manifest['hog_params'].items()}
+        self.classes_ = np.array(self.manifest['classes'])
+        self.params = self.manifest['params']
+        
+        # Memory-map: vários processos carregando o mesmo artefato compartilham as páginas.
+        # asarray tira a subclasse memmap (mesma memória), que encarece cada operação
+        mmap_mode = 'r' if mmap else None
+        self.arrays = {name: np.asarray(np.load(self.path / f"{name}.npy", mmap_mode=mmap_mode))
+                       for name in self.manifest['arrays']}
+        self._roi_buffers = {}
+        
+        if self.model_type in ('svc', 'svc_fast'):
+            self._pair_weights = self._svc_pair_weights()
+        # Pontos de referência do kernel RBF (vetores de suporte ou componentes Nystroem)
+        kernel_points = self.arrays.get('support_vectors', self.arrays.get('components'))
+        if kernel_points is not None:
+            self._kernel_sq_norms = (kernel_points ** 2).sum(axis=1)
+    
+    @classmethod
+    def load(cls, path, mmap=True):
+        """CompactModel do diretório, ou None se não existir ou for inválido"""
+        try:
+            return cls(path, mmap)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Não foi possível carregar o modelo compacto {path}: {e}")
+            return None
+    
+    @property
+    def model(self):
+        # Compatibilidade com o ModelTrainer, que usa model=None para "sem modelo"
+        return self
+    
+    def _svc_pair_weights(self):
+        """Matriz (vetores de suporte x pares) que dá as margens um-contra-um em um produto
+        
+        Para o par (i, j) o libsvm soma os vetores da classe i com dual_coef[j - 1]
+        e os da classe j com dual_coef[i]; os demais vetores têm peso zero.
+        """
+        n_support = self.arrays['n_support']
+        dual_coef = self.arrays['dual_coef']
+        starts = np.concatenate([[0], np.cumsum(n_support)[:-1]])
+        n_classes = len(n_support)
+        
+        weights = np.zeros((int(n_support.sum()), n_classes * (n_classes - 1) // 2))
+        pair = 0
+        for i in range(n_classes):
+            si = slice(starts[i], starts[i] + n_support[i])
+            for j in range(i + 1, n_classes):
+                sj = slice(starts[j], starts[j] + n_support[j])
+                weights[si, pair] = dual_coef[j - 1, si]
+                weights[sj, pair] = dual_coef[i, sj]
+                pair += 1
+        return weights
+    
+    def _libsvm_decision(self, X):
+        """Margens um-contra-um na ordem do libsvm (pares i < j)"""
+        kernel = _rbf_kernel(X, self.arrays['support_vectors'], self.params['gamma'],
+                             self._kernel_sq_norms)
+        return kernel @ self._pair_weights + self.arrays['intercept']
+    
+    @staticmethod
+    def _ovr_decision(decision, n_classes):
+        """Votos + confianças normalizadas, como o decision_function 'ovr' do SVC"""
+        votes = np.zeros((len(decision), n_classes))
+        confidences = np.zeros((len(decision), n_classes))
+        pair = 0
+        for i in range(n_classes):
+            for j in range(i + 1, n_classes):
+                confidences[:, i] += decision[:, pair]
+                confidences[:, j] -= decision[:, pair]
+                votes[decision[:, pair] >= 0, i] += 1
+                votes[decision[:, pair] < 0, j] += 1
+                pair += 1
+        return votes + confidences / (3 * (np.abs(confidences) + 1))
+    
+    @staticmethod
+    def _multiclass_probability(pairwise):
+        """Probabilidades a partir das estimativas por par (método 2 de Wu, Lin e Weng, libsvm)
+        
+        pairwise: lista k x k com r[i][j] = P(i | i ou j). Mesmas iterações do
+        libsvm, em floats do Python: com k = 6 é mais rápido que operações NumPy.
+        """
+        k = len(pairwise)
+        Q = [[-pairwise[j][t] * pairwise[t][j] for j in range(k)] for t in range(k)]
+        for t in range(k):
+            Q[t][t] = sum(pairwise[j][t] ** 2 for j in range(k) if j != t)
+        p = [1.0 / k] * k
+        eps = 0.005 / k
+        
+        for _ in range(max(100, k)):
+            Qp = [sum(Q[t][j] * p[j] for j in range(k)) for t in range(k)]
+            pQp = sum(p[t] * Qp[t] for t in range(k))
+            if max(abs(Qp[t] - pQp) for t in range(k)) < eps:
+                break
+            for t in range(k):
+                diff = (-Qp[t] + pQp) / Q[t][t]
+                p[t] += diff
+                pQp = (pQp + diff * (diff * Q[t][t] + 2 * Qp[t])) / (1 + diff) / (1 + diff)
+                for j in range(k):
+                    Qp[j] = (Qp[j] + diff * Q[t][j]) / (1 + diff)
+                    p[j] /= 1 + diff
+        return p
+    
+    def _svc_probability(self, decision):
+        n_classes = len(self.classes_)
+        f_apb = decision * self.arrays['prob_a'] + self.arrays['prob_b']
+        pairwise_probs = np.clip(np.exp(-np.logaddexp(0, f_apb)), _MIN_PROB, 1 - _MIN_PROB)
+        
+        # r[i][j] = P(i | i ou j) para i < j; r[j][i] = 1 - r[i][j]
+        pairs = [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+        probabilities = np.empty((len(decision), n_classes))
+        for sample, probs in enumerate(pairwise_probs.tolist()):
+            pairwise = [[0.0] * n_classes for _ in range(n_classes)]
+            for (i, j), prob in zip(pairs, probs):
+                pairwise[i][j] = prob
+                pairwise[j][i] = 1 - prob
+            probabilities[sample] = self._multiclass_probability(pairwise)
+        return probabilities
+    
+    def _tree_probability(self, X):
+        arrays = self.arrays
+        left, right = arrays['children_left'], arrays['children_right']
+        # As árvores comparam features em float32
+        X = X.astype(np.float32)
+        
+        # Todas as árvores descem juntas: um passo por nível, (amostras x árvores) nós
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(arrays['roots'], (len(X), len(arrays['roots']))).copy()
+        while True:
+            internal = left[node] >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, arrays['feature'][node]] <= arrays['threshold'][node]
+            node = np.where(internal, np.where(go_left, left[node], right[node]), node)
+        return arrays['value'][node].mean(axis=1)
+    
+    def class_scores(self, features_scaled):
+        """Probabilidade por classe (colunas na ordem de classes_), como model_backends.class_scores"""
+        X = np.asarray(features_scaled, dtype=np.float64)
+        arrays = self.arrays
+        
+        if self.model_type in ('svc', 'svc_fast'):
+            decision = self._libsvm_decision(X)
+            if self.model_type == 'svc':
+                return self._svc_probability(decision)
+            if len(self.classes_) == 2:
+                return _softmax(-decision.ravel())
+            return _softmax(self._ovr_decision(decision, len(self.classes_)))
+        
+        if self.model_type == 'trees':
+            return self._tree_probability(X)
+        
+        if self.model_type == 'nystroem':
+            kernel = _rbf_kernel(X, arrays['components'], self.params['gamma'], self._kernel_sq_norms)
+            X = kernel @ arrays['normalization'].T
+        decision = X @ arrays['coef'].T + arrays['intercept']
+        
+        if self.model_type == 'sgd':
+            # predict_proba da regressão logística um-contra-todos
+            probabilities = np.exp(-np.logaddexp(0, -decision))
+            if probabilities.shape[1] == 1:
+                return np.column_stack([1 - probabilities[:, 0], probabilities[:, 0]])
+            return probabilities / probabilities.sum(axis=1, keepdims=True)
+        return _softmax(decision.ravel() if decision.shape[1] == 1 else decision)
+    
+    def scale(self, features):
+        return (np.asarray(features) - self.arrays['scaler_mean']) / self.arrays['scaler_scale']
+    
+    def _hand_features(self, image, box, landmarks=None, handedness=None):
+        if self.feature_mode == 'landmarks':
+            return landmark_features(landmarks, handedness)
+        return extract_hog(image, box, self.roi_size, self.hog_params, self._roi_buffers)
+    
+    def predict(self, image, box):
+        predictions = self.predict_batch(image, [box])
+        return predictions[0] if predictions else (None, 0)
+    
+    def predict_batch(self, image, boxes, landmarks=None, handedness=None):
+        """Mesmo resultado de ModelTrainer.predict_batch: (dedos, confiança) por caixa"""
+        landmarks = landmarks if landmarks is not None else [None] * len(boxes)
+        handedness = handedness if handedness is not None else [None] * len(boxes)
+        
+        features = []
+        valid_idx = []
+        with metrics.stage('features'):
+            for i, box in enumerate(boxes):
+                try:
+                    features.append(self._hand_features(image, box, landmarks[i], handedness[i]))
+                    valid_idx.append(i)
+                except Exception:
+                    continue
+        
+        results = [(None, 0)] * len(boxes)
+        if not features:
+            return results
+        
+        with metrics.stage('classifier'):
+            probabilities = self.class_scores(self.scale(np.array(features)))
+            best = np.argmax(probabilities, axis=1)
+            predictions = self.classes_[best]
+            confidences = probabilities[np.arange(len(best)), best]
+        
+        for i, prediction, confidence in zip(valid_idx, predictions, confidences):
+            results[i] = (prediction, confidence)
+        return results
+
+def _dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).iterdir() if f.is_file())
+
+def check_parity(trainer, compact, dataset_path, limit=200, repeats=20):
+    """Compara predições e latência do ModelTrainer e do CompactModel nas amostras do dataset"""
+    from data_handler import DataHandler
+    
+    data_handler = DataHandler(dataset_path)
+    samples = data_handler.list_samples()[:limit]
+    landmark_samples = data_handler.list_landmark_samples()[:limit]
+    
+    mismatches = 0
+    max_diff = 0.0
+    checked = 0
+    trainer_times, compact_times = [], []
+    if trainer.feature_mode == 'landmarks':
+        inputs = [(None, [None], [landmarks], [handedness])
+                  for landmarks, handedness, _ in landmark_samples]
+    else:
+        inputs = []
+        for img_path, _, box in samples:
+            image = cv2.imread(str(img_path))
+            if image is not None:
+                inputs.append((image, [box], None, None))
+    
+    for image, boxes, landmarks, handedness in inputs:
+        expected = trainer.predict_batch(image, boxes, landmarks, handedness)
+        actual = compact.predict_batch(image, boxes, landmarks, handedness)
+        for (label, confidence), (compact_label, compact_confidence) in zip(expected, actual):
+            checked += 1
+            if label != compact_label:
+                mismatches += 1
+            max_diff = max(max_diff, abs(float(confidence) - float(compact_confidence)))
+    
+    # Latência: mesmo frame classificado repetidamente pelos dois preditores
+    for image, boxes, landmarks, handedness in inputs[:repeats]:
+        for predictor, times in ((trainer, trainer_times), (compact, compact_times)):
+            start = time.perf_counter()
+            predictor.predict_batch(image, boxes, landmarks, handedness)
+            times.append(time.perf_counter() - start)
+    
+    return {
+        'samples': checked, 'mismatches': mismatches, 'max_confidence_diff': max_diff,
+        'trainer_ms': 1000 * float(np.median(trainer_times)) if trainer_times else None,
+        'compact_ms': 1000 * float(np.median(compact_times)) if compact_times else None
+    }
+
+def classifier_latency(trainer, compact, n_features, n_hands=2, repeats=200):
+    """Mediana (ms) só da normalização + classificador, sem extração de features"""
+    from model_backends import class_scores
+    
+    features = np.random.default_rng(0).normal(size=(n_hands, n_features))
+    timings = {}
+    for name, fn in (('sklearn', lambda: class_scores(trainer.model, trainer.scaler.transform(features))),
+                     ('compact', lambda: compact.class_scores(compact.scale(features)))):
+        fn()
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        timings[name] = 1000 * float(np.median(times))
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o classificador para o formato compacto (NumPy)")
+    parser.add_argument('--features', choices=FEATURE_MODES, default='hog')
+    parser.add_argument('-o', '--output', default=None,
+                        help="diretório do artefato (padrão: hand_model[_landmarks]_compact)")
+    parser.add_argument('--dataset', default='./hand_dataset',
+                        help="amostras usadas na verificação de paridade")
+    parser.add_argument('--limit', type=int, default=200, help="amostras verificadas")
+    parser.add_argument('--no-check', action='store_true', help="apenas exporta")
+    args = parser.parse_args()
+    
+    from model_trainer import ModelTrainer
+    
+    trainer = ModelTrainer(feature_mode=args.features)
+    if not trainer.load_model():
+        print("Modelo não encontrado; treine antes de exportar")
+        sys.exit(1)
+    
+    path = export_model(trainer, args.output)
+    pickle_size = trainer.model_path.stat().st_size + trainer.scaler_path.stat().st_size
+    print(f"Artefato salvo em {path} ({_dir_size(path) / 1024:.0f} KB; "
+          f"pickles {pickle_size / 1024:.0f} KB)")
+    
+    if args.no_check:
+        sys.exit(0)
+    
+    compact = CompactModel(path)
+    report = check_parity(trainer, compact, args.dataset, args.limit)
+    print(f"Paridade: {report['samples']} mãos, {report['mismatches']} rótulos diferentes, "
+          f"diferença máx. de confiança {report['max_confidence_diff']:.2e}")
+    if report['trainer_ms'] is not None:
+        print(f"predict_batch: ModelTrainer {report['trainer_ms']:.3f}ms | "
+              f"compacto {report['compact_ms']:.3f}ms")
+    
+    timings = classifier_latency(trainer, compact, len(compact.arrays['scaler_mean']))
+    print(f"Classificador (2 mãos): sklearn {timings['sklearn']:.3f}ms | "
+          f"compacto {timings['compact']:.3f}ms")
+    
+    if report['mismatches'] or report['max_confidence_diff'] > 1e-6:
+        print("ERRO: o modelo compacto diverge do original")
+        sys.exit(1)
@@ -1,55 +1,250 @@
 from pathlib import Path
+import sqlite3
+import threading
+import time
+import uuid
 import cv2
 import numpy as np
 
 class DataHandler:
-    def __init__(self, base_path="./hand_dataset"):
+    # 'crop': salva apenas a região da mão com margem
+    # 'frame': salva cada frame uma única vez, compartilhado pelas mãos detectadas
+    STORAGE_MODES = ('crop', 'frame')
+    
+    def __init__(self, base_path="./hand_dataset", storage_mode='crop', crop_padding=32):
+        if storage_mode not in self.STORAGE_MODES:
+            raise ValueError(f"Modo de armazenamento inválido: {storage_mode}")
+        
         self.dataset_path = Path(base_path).expanduser()
+        self.storage_mode = storage_mode
+        self.crop_padding = crop_padding
         self._setup_directories()
         
+        # Índice do dataset: rótulo, caixa e metadados de cada amostra
+        self.manifest_path = self.dataset_path / "manifest.db"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.manifest_path), check_same_thread=False)
+        self._setup_manifest()
+    
     def _setup_directories(self):
         for fingers in range(6):  # 0 a 5 dedos
             finger_dir = self.dataset_path / f"{fingers}_fingers"
             finger_dir.mkdir(parents=True, exist_ok=True)
+        (self.dataset_path / "frames").mkdir(parents=True, exist_ok=True)
     
-    def count_existing_images(self):
-        total = 0
-        for finger_dir in self.dataset_path.glob("*_fingers"):
-            total += len(list(finger_dir.glob("*.png")))
-        return total
-    
-    def save_training_image(self, image, box, fingers):
-        finger_dir = self.dataset_path / f"{fingers}_fingers"
-        existing = len(list(finger_dir.glob("*.png")))
-        
-        x1, y1, x2, y2 = box
-        filename = f"{existing+1:04d}_{x1},{y1}_{x2},{y2}.png"
-        filepath = finger_dir / filename
-        
-        cv2.imwrite(str(filepath), image)
-        return filepath
+    def _setup_manifest(self):
+        with self._lock, self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS samples (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    label INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    x1 INTEGER NOT NULL,
+                    y1 INTEGER NOT NULL,
+                    x2 INTEGER NOT NULL,
+                    y2 INTEGER NOT NULL,
+                    frame_id TEXT,
+                    frame_width INTEGER,
+                    frame_height INTEGER,
+                    source TEXT,
+                    captured_at REAL
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS samples_label ON samples (label)")
+            # Contadores mantidos na mesma transação de cada inserção
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS label_counts (
+                    label INTEGER PRIMARY KEY,
+                    total INTEGER NOT NULL
+                )""")
+            self._db.executemany(
+                "INSERT OR IGNORE INTO label_counts (label, total) VALUES (?, 0)",
+                [(fingers,) for fingers in range(6)])
+            
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version < 2:
+                # Posição da imagem salva dentro do frame original (recortes)
+                self._db.execute("ALTER TABLE samples ADD COLUMN offset_x INTEGER NOT NULL DEFAULT 0")
+                self._db.execute("ALTER TABLE samples ADD COLUMN offset_y INTEGER NOT NULL DEFAULT 0")
+                self._db.execute("PRAGMA user_version = 2")
+            if version < 3:
+                # Landmarks (21 x 3, pixels do frame original) e lateralidade da mão
+                self._db.execute("ALTER TABLE samples ADD COLUMN landmarks BLOB")
+                self._db.execute("ALTER TABLE samples ADD COLUMN handedness TEXT")
+                self._db.execute("PRAGMA user_version = 3")
+            if version < 1:
+                # Depois das colunas novas: _insert_sample grava o esquema atual
+                self._import_legacy_images()
     
-    def load_dataset(self):
-        images = []
-        labels = []
-        boxes = []
-        
+    def _import_legacy_images(self):
+        """Indexa imagens antigas que guardavam a caixa no nome do arquivo"""
         for finger_count in range(6):
             finger_dir = self.dataset_path / f"{finger_count}_fingers"
             
-            for img_path in finger_dir.glob("*.png"):
+            for img_path in sorted(finger_dir.glob("*.png")):
                 # Extrair coordenadas do nome do arquivo
                 parts = img_path.stem.split('_')
-                coords1 = parts[1].split(',')
-                coords2 = parts[2].split(',')
+                try:
+                    coords1 = parts[1].split(',')
+                    coords2 = parts[2].split(',')
+                    box = [int(coords1[0]), int(coords1[1]),
+                           int(coords2[0]), int(coords2[1])]
+                except (IndexError, ValueError):
+                    continue
                 
-                box = [int(coords1[0]), int(coords1[1]), 
-                       int(coords2[0]), int(coords2[1])]
+                self._insert_sample(finger_count, img_path.relative_to(self.dataset_path).as_posix(),
+                                    box, source='legacy', captured_at=img_path.stat().st_mtime)
+    
+    def _insert_sample(self, label, path, box, frame_id=None, frame_shape=None,
+                       source=None, captured_at=None, offset=(0, 0),
+                       landmarks=None, handedness=None):
+        x1, y1, x2, y2 = (int(c) for c in box)
+        frame_height, frame_width = frame_shape[:2] if frame_shape is not None else (None, None)
+        if landmarks is not None:
+            landmarks = np.asarray(landmarks, dtype=np.float32).reshape(21, 3).tobytes()
+        cursor = self._db.execute(
+            """INSERT INTO samples (label, path, x1, y1, x2, y2, frame_id, frame_width,
+                                    frame_height, source, captured_at, offset_x, offset_y,
+                                    landmarks, handedness)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (label, path, x1, y1, x2, y2, frame_id, frame_width, frame_height,
+             source, captured_at if captured_at is not None else time.time(),
+             int(offset[0]), int(offset[1]), landmarks, handedness))
+        self._db.execute("UPDATE label_counts SET total = total + 1 WHERE label = ?", (label,))
+        return cursor.lastrowid
+    
+    def count_existing_images(self, label=None):
+        with self._lock:
+            if label is None:
+                row = self._db.execute("SELECT SUM(total) FROM label_counts").fetchone()
+            else:
+                row = self._db.execute("SELECT total FROM label_counts WHERE label = ?",
+                                       (label,)).fetchone()
+        return (row[0] or 0) if row else 0
+    
+    def save_training_image(self, image, box, fingers, source=None, frame_id=None,
+                            landmarks=None, handedness=None):
+        return self.save_training_frame(image, [(box, fingers, landmarks, handedness)],
+                                        source=source, frame_id=frame_id)[0]
+    
+    def save_training_frame(self, frame, annotations, source=None, frame_id=None):
+        """Salva todas as mãos de um frame conforme o modo de armazenamento
+        
+        Cada anotação é (caixa, dedos) ou (caixa, dedos, landmarks, lateralidade),
+        com landmarks 21 x 3 em pixels do frame.
+        """
+        annotations = [tuple(a) + (None,) * (4 - len(a)) for a in annotations]
+        frame_id = frame_id or uuid.uuid4().hex
+        captured_at = time.time()
+        filepaths = []
+        
+        with self._lock, self._db:
+            # Se uma gravação ou o manifesto falhar, as linhas voltam atrás (rollback) e
+            # os arquivos já gravados nesta chamada são removidos: nada fica órfão
+            written = []
+            try:
+                if self.storage_mode == 'frame':
+                    # Um único arquivo por frame; as caixas ficam no manifesto
+                    filepath = self.dataset_path / "frames" / f"{frame_id}.png"
+                    if not cv2.imwrite(str(filepath), frame):
+                        raise IOError(f"Não foi possível salvar {filepath}")
+                    written.append(filepath)
+                    rel_path = filepath.relative_to(self.dataset_path).as_posix()
+                    
+                    for box, fingers, landmarks, handedness in annotations:
+                        self._insert_sample(fingers, rel_path, box, frame_id=frame_id,
+                                            frame_shape=frame.shape, source=source,
+                                            captured_at=captured_at, landmarks=landmarks,
+                                            handedness=handedness)
+                        filepaths.append(filepath)
+                    return filepaths
                 
-                img = cv2.imread(str(img_path))
-                if img is not None:
-                    images.append(img)
-                    labels.append(finger_count)
-                    boxes.append(box)
+                h, w = frame.shape[:2]
+                for box, fingers, landmarks, handedness in annotations:
+                    x1, y1, x2, y2 = (int(c) for c in box)
+                    
+                    # Recorte com margem; a caixa passa a ser relativa ao recorte
+                    cx1 = max(0, x1 - self.crop_padding)
+                    cy1 = max(0, y1 - self.crop_padding)
+                    cx2 = min(w, x2 + self.crop_padding)
+                    cy2 = min(h, y2 + self.crop_padding)
+                    crop_box = (x1 - cx1, y1 - cy1, x2 - cx1, y2 - cy1)
+                    
+                    # O id da amostra define o nome do arquivo, sem colisões após remoções
+                    sample_id = self._insert_sample(fingers, "", crop_box, frame_id=frame_id,
+                                                    frame_shape=frame.shape, source=source,
+                                                    captured_at=captured_at, offset=(cx1, cy1),
+                                                    landmarks=landmarks, handedness=handedness)
+                    filepath = self.dataset_path / f"{fingers}_fingers" / f"{sample_id:06d}.png"
+                    if not cv2.imwrite(str(filepath), frame[cy1:cy2, cx1:cx2]):
+                        raise IOError(f"Não foi possível salvar {filepath}")
+                    written.append(filepath)
+                    self._db.execute("UPDATE samples SET path = ? WHERE id = ?",
+                                     (filepath.relative_to(self.dataset_path).as_posix(), sample_id))
+                    filepaths.append(filepath)
+            except BaseException:
+                for filepath in written:
+                    filepath.unlink(missing_ok=True)
+                raise
+        
+        return filepaths
+    
+    def list_samples(self, labels=None):
+        """Lista (caminho, rótulo, caixa) de cada amostra sem decodificar imagens"""
+        query = "SELECT path, label, x1, y1, x2, y2 FROM samples"
+        params = []
+        if labels is not None:
+            labels = list(labels)
+            query += f" WHERE label IN ({','.join('?' * len(labels))})"
+            params = labels
+        query += " ORDER BY id"
+        
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        
+        return [(self.dataset_path / path, label, [x1, y1, x2, y2])
+                for path, label, x1, y1, x2, y2 in rows]
+    
+    def list_samples_after(self, after_id=0):
+        """Lista (id, caminho, rótulo, caixa) das amostras com id maior que after_id"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, path, label, x1, y1, x2, y2 FROM samples WHERE id > ? ORDER BY id",
+                (after_id,)).fetchall()
+        
+        return [(sample_id, self.dataset_path / path, label, [x1, y1, x2, y2])
+                for sample_id, path, label, x1, y1, x2, y2 in rows]
+    
+    def list_landmark_samples(self, labels=None):
+        """Lista (landmarks, lateralidade, rótulo) das amostras salvas com landmarks"""
+        query = "SELECT landmarks, handedness, label FROM samples WHERE landmarks IS NOT NULL"
+        params = []
+        if labels is not None:
+            labels = list(labels)
+            query += f" AND label IN ({','.join('?' * len(labels))})"
+            params = labels
+        query += " ORDER BY id"
+        
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        
+        return [(np.frombuffer(landmarks, dtype=np.float32).reshape(21, 3), handedness, label)
+                for landmarks, handedness, label in rows]
+    
+    def load_dataset(self, labels=None):
+        images = []
+        labels_out = []
+        boxes = []
+        
+        # Frames compartilhados por várias mãos são decodificados uma única vez
+        decoded = {}
+        
+        for img_path, finger_count, box in self.list_samples(labels):
+            if img_path not in decoded:
+                decoded[img_path] = cv2.imread(str(img_path))
+            img = decoded[img_path]
+            if img is not None:
+                images.append(img)
+                labels_out.append(finger_count)
+                boxes.append(box)
         
-        return images, labels, boxes
\ No newline at end of file
+        return images, labels_out, boxes
\ No newline at end of file
@@ -0,0 +1,175 @@
+import json
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+
+def _key(value):
+    """Chave lida do JSON: listas voltam a ser tuplas"""
+    return tuple(_key(item) for item in value) if isinstance(value, list) else value
+
+class FeatureCache:
+    """Armazena em disco as features já extraídas de cada amostra do dataset
+
+    O cache é um diretório: features.f32 guarda as features em float32, uma linha
+    por amostra, e keys.jsonl a chave de cada linha, na mesma ordem. Os dois só
+    recebem dados no final: um treino grava apenas as features novas e a leitura
+    usa memory-map, sem carregar o cache inteiro.
+    """
+
+    VERSION = 2
+    # Linhas de amostras que não existem mais são descartadas (cache reescrito)
+    # quando passam desta fração do total
+    MAX_STALE = 0.5
+
+    def __init__(self, cache_dir, config=None):
+        self.path = Path(cache_dir)
+        self.features_path = self.path / "features.f32"
+        self.keys_path = self.path / "keys.jsonl"
+        self.meta_path = self.path / "meta.json"
+        # Mudanças na configuração de extração invalidam o cache inteiro
+        self.config = json.loads(json.dumps(config))
+        self.rows = {}
+        self.n_rows = 0
+        self.features = None
+        self.pending = {}
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+        self._valid = False
+        self._keys_bytes = 0
+        self._load()
+
+        # Cache em pickle das versões anteriores
+        self.path.with_suffix('.pkl').unlink(missing_ok=True)
+
+    def _load(self):
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            with open(self.keys_path, 'rb') as f:
+                lines = f.read().split(b'\n')
+        except (OSError, ValueError):
+            return
+        if meta.get('version') != self.VERSION or meta.get('config') != self.config:
+            return
+        self._valid = True
+
+        # A última linha de keys.jsonl (sem '\n') e sobras no fim de features.f32 são
+        # de uma escrita interrompida: valem só as linhas completas nos dois arquivos
+        row_bytes = 4 * meta['n_features']
+        if not row_bytes or not self.features_path.exists():
+            return
+        n_rows = min(len(lines) - 1, self.features_path.stat().st_size // row_bytes)
+        for row, line in enumerate(lines[:n_rows]):
+            self.rows[_key(json.loads(line))] = row
+        self.n_rows = n_rows
+        self._keys_bytes = sum(len(line) + 1 for line in lines[:n_rows])
+        if n_rows:
+            self.features = np.memmap(self.features_path, dtype=np.float32, mode='r',
+                                      shape=(n_rows, meta['n_features']))
+
+    @staticmethod
+    def make_key(img_path, box):
+        """Chave da amostra: caminho, data de modificação e caixa"""
+        mtime = os.stat(img_path).st_mtime_ns
+        return (str(img_path), mtime, tuple(int(c) for c in box))
+
+    def get(self, key):
+        row = self.rows.get(key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.used.add(key)
+        return self.features[row]
+
+    def put(self, key, features):
+        """Guarda as features para o próximo save(); retorna a versão float32 armazenada"""
+        features = np.asarray(features, dtype=np.float32)
+        self.pending[key] = features
+        self.used.add(key)
+        return features
+
+    def save(self):
+        """Grava as features novas no fim do cache; retorna False se não havia o que gravar
+
+        O cache só é reescrito por inteiro (em um diretório temporário, trocado no
+        final) quando é novo, mudou de configuração ou tem muitas linhas obsoletas.
+        """
+        stale = self.n_rows - len(self.used & self.rows.keys())
+        if not self._valid or not self.n_rows or stale > self.MAX_STALE * self.n_rows:
+            if not self.pending and not self.n_rows:
+                return False
+            self._rewrite()
+            return True
+        if not self.pending:
+            return False
+        self._append()
+        return True
+
+    def _append(self):
+        # Descarta sobras de uma escrita interrompida antes de acrescentar
+        for path, size in ((self.features_path, self.features.nbytes),
+                           (self.keys_path, self._keys_bytes)):
+            if path.exists() and path.stat().st_size != size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+        # Features primeiro: uma chave gravada sempre tem sua linha completa
+        keys = list(self.pending)
+        self._write(self.features_path, b''.join(self.pending[key].tobytes() for key in keys))
+        lines = b''.join(json.dumps(key).encode() + b'\n' for key in keys)
+        self._write(self.keys_path, lines)
+
+        for key in keys:
+            self.rows[key] = self.n_rows
+            self.n_rows += 1
+        self._keys_bytes += len(lines)
+        self.features = np.memmap(self.features_path, dtype=np.float32, mode='r',
+                                  shape=(self.n_rows, len(self.pending[keys[0]])))
+        self.pending = {}
+
+    @staticmethod
+    def _write(path, data):
+        with open(path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite(self):
+        """Grava um cache novo só com as amostras usadas e troca o diretório atual por ele"""
+        kept = [key for key in self.rows if key in self.used and key not in self.pending]
+        rows = [(key, self.features[self.rows[key]]) for key in kept] + list(self.pending.items())
+        n_features = len(rows[0][1]) if rows else 0
+
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        old_path = self.path.with_name(self.path.name + '.old')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        with open(tmp_path / self.features_path.name, 'wb') as f:
+            for _, features in rows:
+                f.write(features.tobytes())
+        lines = b''.join(json.dumps(key).encode() + b'\n' for key, _ in rows)
+        with open(tmp_path / self.keys_path.name, 'wb') as f:
+            f.write(lines)
+        with open(tmp_path / self.meta_path.name, 'w') as f:
+            json.dump({'version': self.VERSION, 'config': self.config,
+                       'n_features': n_features}, f)
+
+        # O memmap antigo precisa ser fechado antes de remover o diretório
+        self.features = None
+        shutil.rmtree(old_path, ignore_errors=True)
+        if self.path.exists():
+            os.replace(self.path, old_path)
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        self.rows = {key: row for row, (key, _) in enumerate(rows)}
+        self.n_rows = len(rows)
+        self._keys_bytes = len(lines)
+        self._valid = True
+        self.pending = {}
+        if rows:
+            self.features = np.memmap(self.features_path, dtype=np.float32, mode='r',
+                                      shape=(self.n_rows, n_features))
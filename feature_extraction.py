@@ -0,0 +1,93 @@
+import cv2
+import numpy as np
+from frame_buffers import reuse_buffer
+
+# skimage é importado só ao extrair HOG: o modo treino usa landmark_features
+# (captura automática) sem carregar o scikit-image
+
+ROI_SIZE = (64, 128)
+HOG_PARAMS = {
+    'orientations': 9,
+    'pixels_per_cell': (8, 8),
+    'cells_per_block': (2, 2),
+    'block_norm': 'L2-Hys'
+}
+
+def extract_roi(image, box, roi_size=ROI_SIZE, buffers=None):
+    """Recorta a caixa e redimensiona para tamanho fixo, em tons de cinza
+    
+    buffers: dict reaproveitado entre chamadas para o redimensionamento e a
+    conversão (sem alocar por mão); a ROI retornada é sobrescrita na próxima
+    chamada com o mesmo dict.
+    """
+    x1, y1, x2, y2 = box
+    roi = image[y1:y2, x1:x2]
+    if buffers is None:
+        # Redimensionar para tamanho fixo
+        roi_resized = cv2.resize(roi, roi_size)
+        return cv2.cvtColor(roi_resized, cv2.COLOR_BGR2GRAY)
+    
+    w, h = roi_size
+    resized = buffers['resized'] = reuse_buffer(buffers.get('resized'), (h, w, 3))
+    gray = buffers['gray'] = reuse_buffer(buffers.get('gray'), (h, w))
+    cv2.resize(roi, roi_size, dst=resized)
+    return cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY, dst=gray)
+
+def extract_hog(image, box, roi_size=ROI_SIZE, hog_params=HOG_PARAMS, buffers=None):
+    """Recorta a caixa, redimensiona para tamanho fixo e extrai features HOG"""
+    from skimage.feature import hog
+    return hog(extract_roi(image, box, roi_size, buffers), **hog_params)
+
+def extract_chunk(chunk, roi_size=ROI_SIZE, hog_params=HOG_PARAMS):
+    """Decodifica e extrai features de um lote de (caminho, caixa) em um processo"""
+    results = []
+    decoded = {}
+    
+    for img_path, box in chunk:
+        try:
+            # Frames compartilhados por várias mãos são decodificados uma vez por lote
+            if img_path not in decoded:
+                decoded[img_path] = cv2.imread(str(img_path))
+            img = decoded[img_path]
+            if img is None:
+                results.append((None, f"Não foi possível ler {img_path}"))
+                continue
+            results.append((extract_hog(img, box, roi_size, hog_params), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    
+    return results
+
+def extract_packed_chunk(rows, rois_path, shape, hog_params=HOG_PARAMS):
+    """Features HOG de linhas do arquivo de ROIs empacotadas, sem decodificar imagens"""
+    from skimage.feature import hog
+    rois = np.memmap(rois_path, dtype=np.uint8, mode='r', shape=shape)
+    results = []
+    for row in rows:
+        try:
+            results.append((hog(rois[row], **hog_params), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+# Pontos de referência usados na normalização dos landmarks
+WRIST = 0
+MIDDLE_MCP = 9
+
+def landmark_features(landmarks, handedness):
+    """Vetor de 63 features a partir dos 21 landmarks (x, y, z) em pixels
+    
+    Coordenadas relativas ao pulso, escaladas pela distância pulso-base do
+    dedo médio e espelhadas para mãos esquerdas.
+    """
+    points = np.asarray(landmarks, dtype=np.float64).reshape(21, 3)
+    points = points - points[WRIST]
+    
+    if handedness == 'Left':
+        points[:, 0] = -points[:, 0]
+    
+    scale = np.linalg.norm(points[MIDDLE_MCP, :2])
+    if scale < 1e-6:
+        scale = np.abs(points[:, :2]).max() or 1.0
+    
+    return (points / scale).ravel()
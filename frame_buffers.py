@@ -0,0 +1,18 @@
+import numpy as np
+
+def reuse_buffer(buffer, shape, dtype=np.uint8):
+    """Reaproveita o buffer se tiver o formato pedido; senão aloca um novo
+    
+    Usado com os parâmetros dst= do OpenCV para que o caminho do frame não
+    aloque arrays a cada iteração (a alocação só ocorre no primeiro frame ou
+    quando a resolução muda).
+    """
+    if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+        return np.empty(shape, dtype=dtype)
+    return buffer
+
+def copy_into(buffer, frame):
+    """Cópia de frame em buffer reaproveitado (sem alocar); retorna o buffer usado"""
+    buffer = reuse_buffer(buffer, frame.shape, frame.dtype)
+    np.copyto(buffer, frame)
+    return buffer
@@ -1,192 +1,281 @@
 import cv2
 import numpy as np
 import mediapipe as mp
+from functools import cached_property
+from mediapipe.framework.formats import landmark_pb2
+from frame_buffers import reuse_buffer
+from metrics import metrics
+
+# Pontos de referência dos dedos (landmarks do MediaPipe)
+WRIST = 0
+THUMB_IP = 3
+THUMB_TIP = 4
+MIDDLE_MCP = 9
+MIDDLE_TIP = 12
+FINGER_MCPS = [5, 9, 13, 17]
+FINGER_PIPS = [6, 10, 14, 18]
+FINGER_DIPS = [7, 11, 15, 19]
+FINGER_TIPS = [8, 12, 16, 20]
+
+# Layout serializado de um NormalizedLandmark com x, y e z: cabeçalho da
+# submensagem (tag 0x0a, tamanho 15) seguido dos três campos float
+_LANDMARK_DTYPE = np.dtype([
+    ('header', 'u1', 3), ('x', '<f4'), ('tag_y', 'u1'), ('y', '<f4'), ('tag_z', 'u1'), ('z', '<f4')
+])
+_LANDMARK_HEADER = np.array([0x0a, 0x0f, 0x0d], dtype=np.uint8)
+
+def box_iou(box_a, box_b):
+    """Interseção sobre união de duas caixas (x1, y1, x2, y2)"""
+    ix1, iy1 = max(box_a[0], box_b[0]), max(box_a[1], box_b[1])
+    ix2, iy2 = min(box_a[2], box_b[2]), min(box_a[3], box_b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+class HandDetections:
+    """Resultado de uma passada do MediaPipe sobre um frame
+    
+    Caixas, landmarks, contagem de dedos e classificação do modelo são
+    calculados sob demanda e reaproveitados por quem consultar o mesmo frame.
+    """
+    
+    def __init__(self, frame, multi_hand_landmarks=None, multi_handedness=None,
+                 landmarks=None, handedness=None):
+        self.frame = frame
+        self.height, self.width = frame.shape[:2]
+        self._hand_landmarks = multi_hand_landmarks
+        self._multi_handedness = multi_handedness
+        
+        # Landmarks normalizados (n_mãos, 21, 3) e lateralidade podem ser
+        # fornecidos diretamente, sem resultado do MediaPipe
+        if landmarks is not None:
+            self.__dict__['landmarks'] = landmarks
+        if handedness is not None:
+            self.__dict__['handedness'] = list(handedness)
+        
+        self._predictions = None
+    
+    def __len__(self):
+        if self._hand_landmarks is not None:
+            return len(self._hand_landmarks)
+        return len(self.landmarks)
+    
+    @cached_property
+    def landmarks(self):
+        """Landmarks normalizados de todas as mãos (n_mãos, 21, 3)"""
+        if not self._hand_landmarks:
+            return np.empty((0, 21, 3))
+        return HandDetector._landmarks_array(self._hand_landmarks)
+    
+    @cached_property
+    def handedness(self):
+        """'Right' ou 'Left' para cada mão"""
+        if not self._multi_handedness:
+            return []
+        return [hand.classification[0].label for hand in self._multi_handedness]
+    
+    @cached_property
+    def points(self):
+        """Landmarks em pixels do frame (n_mãos, 21, 3)"""
+        return self.landmarks * (self.width, self.height, self.width)
+    
+    @cached_property
+    def boxes(self):
+        if len(self) == 0:
+            return []
+        return HandDetector._boxes_from_landmarks(self.landmarks, self.width, self.height)
+    
+    @cached_property
+    def finger_counts(self):
+        """Contagem de dedos pela regra dos landmarks"""
+        if len(self) == 0:
+            return []
+        is_right_hand = np.array([label == 'Right' for label in self.handedness])
+        return [int(c) for c in HandDetector._count_fingers_batch(self.landmarks, is_right_hand)]
+    
+    @cached_property
+    def hand_landmarks(self):
+        """Landmarks no formato do MediaPipe (para desenho)"""
+        if self._hand_landmarks is not None:
+            return list(self._hand_landmarks)
+        
+        hand_landmarks = []
+        for hand in self.landmarks:
+            landmark_list = landmark_pb2.NormalizedLandmarkList()
+            for x, y, z in hand:
+                landmark = landmark_list.landmark.add()
+                landmark.x, landmark.y, landmark.z = x, y, z
+            hand_landmarks.append(landmark_list)
+        return hand_landmarks
+    
+    def predictions(self, model_trainer):
+        """(dedos, confiança) do modelo para cada mão; calculado uma vez por modelo"""
+        if self._predictions is None or self._predictions[0] is not model_trainer:
+            predictions = model_trainer.predict_batch(self.frame, self.boxes, self.points,
+                                                      self.handedness)
+            self._predictions = (model_trainer, predictions)
+        return self._predictions[1]
+    
+    def classified(self, model_trainer):
+        """Lista (caixa, dedos, confiança); dedos = -1 se não há modelo"""
+        if len(self) == 0:
+            return []
+        
+        # Se não há modelo, apenas detectar sem classificar
+        if not (model_trainer and model_trainer.model):
+            return [(box, -1, 0) for box in self.boxes]
+        
+        return [(box, fingers, confidence)
+                for box, (fingers, confidence) in zip(self.boxes, self.predictions(model_trainer))
+                if fingers is not None]
+    
+    def with_finger_count(self):
+        """Lista de dicionários com caixa, contagem do MediaPipe e landmarks"""
+        return [{
+            'box': self.boxes[i],
+            'fingers': self.finger_counts[i],
+            'landmarks': self.hand_landmarks[i],
+            'points': self.points[i],
+            'handedness': self.handedness[i]
+        } for i in range(len(self))]
 
 class HandDetector:
-    def __init__(self):
+    def __init__(self, inference_width=None, inference_scale=None, static_image_mode=False):
         self.mp_hands = mp.solutions.hands
+        # static_image_mode=True trata cada frame de forma independente (imagens soltas)
         self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
+            static_image_mode=static_image_mode,
             max_num_hands=10,  # Detecta até 10 mãos
             min_detection_confidence=0.7,
             min_tracking_confidence=0.5
         )
         self.mp_drawing = mp.solutions.drawing_utils
         
+        # Resolução usada pelo MediaPipe: largura máxima ou fator de escala.
+        # Os landmarks são normalizados, então caixas e pontos continuam em
+        # coordenadas do frame original
+        self.inference_width = inference_width
+        self.inference_scale = inference_scale
+        self._small_frame = None
+        self._rgb_frame = None
+        
+    def _inference_size(self, w, h):
+        """(largura, altura) para a inferência, ou None para usar o frame inteiro"""
+        scale = 1.0
+        if self.inference_width and w > self.inference_width:
+            scale = self.inference_width / w
+        elif self.inference_scale and self.inference_scale < 1:
+            scale = self.inference_scale
+        if scale >= 1:
+            return None
+        return max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+    
+    def _prepare_rgb(self, frame):
+        """Reduz (se configurado) e converte para RGB em buffers reutilizados"""
+        h, w = frame.shape[:2]
+        size = self._inference_size(w, h)
+        if size is not None:
+            self._small_frame = reuse_buffer(self._small_frame, (size[1], size[0], 3))
+            cv2.resize(frame, size, dst=self._small_frame, interpolation=cv2.INTER_AREA)
+            frame = self._small_frame
+        
+        self._rgb_frame = reuse_buffer(self._rgb_frame, frame.shape)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_frame)
+        return self._rgb_frame
+    
+    def detect(self, frame):
+        """Executa o MediaPipe uma única vez e retorna o resultado do frame"""
+        # Converter BGR para RGB (MediaPipe usa RGB), na resolução de inferência
+        with metrics.stage('cvtColor'):
+            rgb_frame = self._prepare_rgb(frame)
+        with metrics.stage('mediapipe'):
+            results = self.hands.process(rgb_frame)
+        
+        if not results.multi_hand_landmarks:
+            return HandDetections(frame)
+        return HandDetections(frame, results.multi_hand_landmarks, results.multi_handedness)
+    
     def detect_hands(self, frame, model_trainer):
-        detections = []
-        
-        # Converter BGR para RGB (MediaPipe usa RGB)
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
-        
-        if results.multi_hand_landmarks:
-            h, w, _ = frame.shape
-            
-            for hand_landmarks in results.multi_hand_landmarks:
-                # Obter bounding box da mão
-                x_coords = [lm.x * w for lm in hand_landmarks.landmark]
-                y_coords = [lm.y * h for lm in hand_landmarks.landmark]
-                
-                margin = 30
-                x1 = max(0, int(min(x_coords)) - margin)
-                y1 = max(0, int(min(y_coords)) - margin)
-                x2 = min(w, int(max(x_coords)) + margin)
-                y2 = min(h, int(max(y_coords)) + margin)
-                
-                # Classificar número de dedos se modelo disponível
-                if model_trainer and model_trainer.model:
-                    fingers, confidence = model_trainer.predict(frame, (x1, y1, x2, y2))
-                    if fingers is not None:
-                        detections.append(((x1, y1, x2, y2), fingers, confidence))
-                else:
-                    # Se não há modelo, apenas detectar sem classificar
-                    detections.append(((x1, y1, x2, y2), -1, 0))
-        
-        return detections
+        return self.detect(frame).classified(model_trainer)
     
     def detect_hands_with_finger_count(self, frame):
         """Detecta mãos e conta dedos usando apenas MediaPipe"""
-        detections = []
-        
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
-        
-        if results.multi_hand_landmarks:
-            h, w, _ = frame.shape
-            
-            for hand_idx, hand_landmarks in enumerate(results.multi_hand_landmarks):
-                # Obter bounding box
-                x_coords = [lm.x * w for lm in hand_landmarks.landmark]
-                y_coords = [lm.y * h for lm in hand_landmarks.landmark]
-                
-                margin = 30
-                x1 = max(0, int(min(x_coords)) - margin)
-                y1 = max(0, int(min(y_coords)) - margin)
-                x2 = min(w, int(max(x_coords)) + margin)
-                y2 = min(h, int(max(y_coords)) + margin)
-                
-                # Contar dedos levantados
-                finger_count = self._count_fingers(hand_landmarks, results.multi_handedness[hand_idx])
-                
-                detections.append({
-                    'box': (x1, y1, x2, y2),
-                    'fingers': finger_count,
-                    'landmarks': hand_landmarks
-                })
-        
-        return detections
+        return self.detect(frame).with_finger_count()
+    
+    @staticmethod
+    def _landmarks_array(multi_hand_landmarks):
+        """Landmarks normalizados de todas as mãos em um array (n_mãos, 21, 3)"""
+        # Ler x, y, z campo a campo do protobuf custa ~0.2us por acesso; quando
+        # a mensagem serializada tem o layout fixo esperado (apenas x, y, z em
+        # cada landmark) os valores são lidos direto dos bytes
+        buffer = b''.join([hand_landmarks.SerializeToString()
+                           for hand_landmarks in multi_hand_landmarks])
+        if len(buffer) == len(multi_hand_landmarks) * 21 * _LANDMARK_DTYPE.itemsize:
+            records = np.frombuffer(buffer, dtype=_LANDMARK_DTYPE)
+            if ((records['header'] == _LANDMARK_HEADER).all() and
+                    (records['tag_y'] == 0x15).all() and (records['tag_z'] == 0x1d).all()):
+                landmarks = np.empty((len(records), 3))
+                landmarks[:, 0] = records['x']
+                landmarks[:, 1] = records['y']
+                landmarks[:, 2] = records['z']
+                return landmarks.reshape(-1, 21, 3)
+        
+        return np.array([[(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+                         for hand_landmarks in multi_hand_landmarks])
+    
+    @staticmethod
+    def _boxes_from_landmarks(landmarks, w, h, margin=30):
+        """Caixas (x1, y1, x2, y2) em pixels com margem, limitadas ao frame"""
+        xy = landmarks[:, :, :2] * (w, h)
+        mins = np.maximum(np.trunc(xy.min(axis=1)) - margin, 0)
+        maxs = np.minimum(np.trunc(xy.max(axis=1)) + margin, (w, h))
+        boxes = np.concatenate([mins, maxs], axis=1).astype(int)
+        return [tuple(box) for box in boxes.tolist()]
     
     def _count_fingers(self, hand_landmarks, handedness):
         """Conta dedos levantados usando landmarks do MediaPipe com lógica melhorada"""
-        fingers_up = 0
-        
-        # Pontos de referência dos dedos
-        WRIST = 0
-        THUMB_CMC = 1
-        THUMB_MCP = 2
-        THUMB_IP = 3
-        THUMB_TIP = 4
-        
-        INDEX_MCP = 5
-        INDEX_PIP = 6
-        INDEX_DIP = 7
-        INDEX_TIP = 8
-        
-        MIDDLE_MCP = 9
-        MIDDLE_PIP = 10
-        MIDDLE_DIP = 11
-        MIDDLE_TIP = 12
-        
-        RING_MCP = 13
-        RING_PIP = 14
-        RING_DIP = 15
-        RING_TIP = 16
-        
-        PINKY_MCP = 17
-        PINKY_PIP = 18
-        PINKY_DIP = 19
-        PINKY_TIP = 20
-        
-        landmarks = hand_landmarks.landmark
-        
-        # Verificar se é mão direita ou esquerda
-        is_right_hand = handedness.classification[0].label == 'Right'
-        
-        # Calcular orientação da mão (palma virada para câmera ou não)
-        # Usando vetor do pulso para o meio da mão
-        wrist_to_middle = (
-            landmarks[MIDDLE_MCP].x - landmarks[WRIST].x,
-            landmarks[MIDDLE_MCP].y - landmarks[WRIST].y,
-            landmarks[MIDDLE_MCP].z - landmarks[WRIST].z
-        )
-        
-        # Se z é negativo, a palma está virada para a câmera
-        palm_facing_camera = wrist_to_middle[2] < 0
+        landmarks = self._landmarks_array([hand_landmarks])
+        is_right_hand = np.array([handedness.classification[0].label == 'Right'])
+        return int(self._count_fingers_batch(landmarks, is_right_hand)[0])
+    
+    @staticmethod
+    def _count_fingers_batch(landmarks, is_right_hand):
+        """Conta dedos levantados de todas as mãos (n_mãos, 21, 3) de uma vez"""
+        x = landmarks[:, :, 0]
+        y = landmarks[:, :, 1]
+        z = landmarks[:, :, 2]
         
-        # POLEGAR - lógica especial considerando movimento lateral
-        # Calcular distância entre ponta do polegar e base do indicador
-        thumb_to_index_base_x = abs(landmarks[THUMB_TIP].x - landmarks[INDEX_MCP].x)
-        thumb_to_index_base_y = abs(landmarks[THUMB_TIP].y - landmarks[INDEX_MCP].y)
+        # Se z do vetor pulso -> meio da mão é negativo, a palma está virada para a câmera
+        palm_facing_camera = (z[:, MIDDLE_MCP] - z[:, WRIST]) < 0
         
         # Threshold adaptativo baseado no tamanho da mão
-        hand_scale = abs(landmarks[WRIST].y - landmarks[MIDDLE_TIP].y)
-        thumb_threshold = hand_scale * 0.3
-        
-        # Polegar levantado se estiver afastado lateralmente
-        if is_right_hand:
-            if palm_facing_camera:
-                if landmarks[THUMB_TIP].x < landmarks[THUMB_IP].x - 0.02:
-                    fingers_up += 1
-            else:
-                if landmarks[THUMB_TIP].x > landmarks[THUMB_IP].x + 0.02:
-                    fingers_up += 1
-        else:
-            if palm_facing_camera:
-                if landmarks[THUMB_TIP].x > landmarks[THUMB_IP].x + 0.02:
-                    fingers_up += 1
-            else:
-                if landmarks[THUMB_TIP].x < landmarks[THUMB_IP].x - 0.02:
-                    fingers_up += 1
+        hand_scale = np.abs(y[:, WRIST] - y[:, MIDDLE_TIP])
+        
+        # POLEGAR - levantado se estiver afastado lateralmente; o lado depende
+        # da mão (direita/esquerda) e de a palma estar ou não virada para a câmera
+        thumb_left = x[:, THUMB_TIP] < x[:, THUMB_IP] - 0.02
+        thumb_right = x[:, THUMB_TIP] > x[:, THUMB_IP] + 0.02
+        thumb_up = np.where(is_right_hand == palm_facing_camera, thumb_left, thumb_right)
         
         # OUTROS DEDOS - verificar se estão estendidos
-        fingers = [
-            (INDEX_TIP, INDEX_DIP, INDEX_PIP, INDEX_MCP),
-            (MIDDLE_TIP, MIDDLE_DIP, MIDDLE_PIP, MIDDLE_MCP),
-            (RING_TIP, RING_DIP, RING_PIP, RING_MCP),
-            (PINKY_TIP, PINKY_DIP, PINKY_PIP, PINKY_MCP)
-        ]
-        
-        for tip, dip, pip, mcp in fingers:
-            # Calcular se o dedo está estendido usando múltiplos pontos
-            tip_y = landmarks[tip].y
-            dip_y = landmarks[dip].y
-            pip_y = landmarks[pip].y
-            mcp_y = landmarks[mcp].y
-            
-            # Verificar se o dedo está dobrado calculando ângulos
-            # Dedo levantado: ponta acima de todas as articulações
-            if palm_facing_camera:
-                # Palma para câmera - lógica normal
-                if tip_y < dip_y - 0.01 and dip_y < pip_y:
-                    fingers_up += 1
-            else:
-                # Dorso da mão para câmera - inverter lógica em alguns casos
-                # Mas ainda verificar se está estendido
-                finger_extended = (
-                    abs(tip_y - mcp_y) > hand_scale * 0.3 and
-                    tip_y < pip_y
-                )
-                if finger_extended:
-                    fingers_up += 1
-        
-        return fingers_up
+        tip_y = y[:, FINGER_TIPS]
+        dip_y = y[:, FINGER_DIPS]
+        pip_y = y[:, FINGER_PIPS]
+        mcp_y = y[:, FINGER_MCPS]
+        
+        # Palma para câmera: ponta acima de todas as articulações
+        extended_palm = (tip_y < dip_y - 0.01) & (dip_y < pip_y)
+        # Dorso para câmera: dedo longo o suficiente e ponta acima do PIP
+        extended_back = (np.abs(tip_y - mcp_y) > hand_scale[:, None] * 0.3) & (tip_y < pip_y)
+        extended = np.where(palm_facing_camera[:, None], extended_palm, extended_back)
+        
+        return thumb_up.astype(int) + extended.sum(axis=1)
     
     def get_hand_landmarks(self, frame):
         """Retorna landmarks para análise mais detalhada se necessário"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
-        return results.multi_hand_landmarks
+        return self.detect(frame).hand_landmarks or None
     
     def draw_landmarks(self, frame, hand_landmarks):
         """Desenha os pontos da mão para debug"""
@@ -0,0 +1,154 @@
+from collections import Counter, deque
+import numpy as np
+from hand_detector import box_iou
+
+class HandTrack:
+    """Uma mão acompanhada entre frames, com a última classificação em cache"""
+    
+    def __init__(self, track_id, box, points, handedness, smoothing):
+        self.id = track_id
+        self.box = box
+        self.points = points
+        self.handedness = handedness
+        self.missed = 0
+        
+        # Classificação do modelo e onde a mão estava quando foi feita
+        self.prediction = None
+        self.confidence = 0
+        self.classified_by = None
+        self.classified_box = None
+        self.classified_points = None
+        
+        self.history = deque(maxlen=smoothing)
+    
+    @property
+    def fingers(self):
+        """Contagem suavizada: valor mais frequente no histórico recente"""
+        if not self.history:
+            return None
+        counts = Counter(self.history)
+        best = max(counts.values())
+        # Empate: vale o valor mais recente entre os mais frequentes
+        for value in reversed(self.history):
+            if counts[value] == best:
+                return value
+    
+    def needs_classification(self, model_trainer, min_iou, max_motion):
+        if self.classified_by is not model_trainer or self.prediction is None:
+            return True
+        if box_iou(self.box, self.classified_box) < min_iou:
+            return True
+        
+        # Mudança de pose: deslocamento mediano dos landmarks relativo ao tamanho da mão
+        size = max(self.box[2] - self.box[0], self.box[3] - self.box[1], 1)
+        displacement = np.linalg.norm(self.points[:, :2] - self.classified_points[:, :2], axis=1)
+        return np.median(displacement) / size > max_motion
+
+class HandTracker:
+    """Associa mãos entre frames por IoU e reclassifica apenas as que mudaram
+    
+    Cada trilha guarda a última classificação do modelo; ela só é refeita quando
+    a caixa ou os landmarks se afastam além dos limites. A contagem exibida é a
+    moda das últimas contagens da trilha, o que também reduz a oscilação.
+    """
+    
+    def __init__(self, match_iou=0.3, max_missed=5, reclassify_iou=0.85,
+                 reclassify_motion=0.05, smoothing=5):
+        self.match_iou = match_iou
+        self.max_missed = max_missed
+        self.reclassify_iou = reclassify_iou
+        self.reclassify_motion = reclassify_motion
+        self.smoothing = smoothing
+        
+        self.tracks = []
+        self._next_id = 1
+        
+        # Mãos vistas vs. mãos efetivamente enviadas ao classificador
+        self.hands_seen = 0
+        self.classifications = 0
+    
+    def _associate(self, boxes):
+        """Pareamento guloso por maior IoU entre trilhas e detecções"""
+        pairs = sorted(((box_iou(track.box, box), t, d)
+                        for t, track in enumerate(self.tracks)
+                        for d, box in enumerate(boxes)), reverse=True)
+        matches = {}
+        used_tracks = set()
+        for iou, t, d in pairs:
+            if iou < self.match_iou:
+                break
+            if t in used_tracks or d in matches:
+                continue
+            matches[d] = t
+            used_tracks.add(t)
+        return matches, used_tracks
+    
+    def update(self, result, model_trainer=None):
+        """Atualiza as trilhas com o HandDetections do frame; retorna as trilhas visíveis"""
+        boxes = result.boxes
+        matches, used_tracks = self._associate(boxes)
+        
+        # Trilhas sem detecção neste frame expiram após max_missed frames
+        for t, track in enumerate(self.tracks):
+            if t not in used_tracks:
+                track.missed += 1
+        
+        visible = []
+        for d, box in enumerate(boxes):
+            if d in matches:
+                track = self.tracks[matches[d]]
+                track.box = box
+                track.points = result.points[d]
+                track.handedness = result.handedness[d]
+                track.missed = 0
+            else:
+                track = HandTrack(self._next_id, box, result.points[d], result.handedness[d],
+                                  self.smoothing)
+                self._next_id += 1
+                self.tracks.append(track)
+            visible.append(track)
+        
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+        self.hands_seen += len(visible)
+        
+        if model_trainer and model_trainer.model:
+            self._classify(result, visible, model_trainer)
+            for track in visible:
+                if track.prediction is not None:
+                    track.history.append(track.prediction)
+        else:
+            # Sem modelo, suavizar a contagem pela regra dos landmarks
+            for track, fingers in zip(visible, result.finger_counts):
+                track.history.append(fingers)
+        
+        return visible
+    
+    def _classify(self, result, visible, model_trainer):
+        pending = [d for d, track in enumerate(visible)
+                   if track.needs_classification(model_trainer, self.reclassify_iou,
+                                                 self.reclassify_motion)]
+        if not pending:
+            return
+        
+        # Apenas as mãos que mudaram vão ao classificador, em um único lote
+        predictions = model_trainer.predict_batch(
+            result.frame,
+            [result.boxes[d] for d in pending],
+            [result.points[d] for d in pending],
+            [result.handedness[d] for d in pending]
+        )
+        self.classifications += len(pending)
+        
+        for d, (fingers, confidence) in zip(pending, predictions):
+            track = visible[d]
+            track.prediction = fingers
+            track.confidence = confidence
+            track.classified_by = model_trainer
+            track.classified_box = track.box
+            track.classified_points = track.points
+    
+    def summary(self):
+        if not self.hands_seen:
+            return "Trilhas: 0"
+        return (f"Trilhas: {len(self.tracks)} | Classificações: {self.classifications}/"
+                f"{self.hands_seen} ({self.classifications / self.hands_seen:.0%})")
@@ -1,74 +1,329 @@
 #!/usr/bin/env python3
+import time
+
+# Referência para o tempo até o primeiro frame (inclui os imports)
+_START = time.perf_counter()
+
+import argparse
+import threading
 import cv2
 import numpy as np
 from pathlib import Path
 from data_handler import DataHandler
-from model_trainer import ModelTrainer
-from hand_detector import HandDetector
+from frame_buffers import copy_into
 from capture_manager import CaptureManager
+from pipeline import FramePipeline
+from metrics import metrics
+from model_backends import FEATURE_MODES, MODEL_TYPES
+
+# MediaPipe (hand_detector) e scikit-learn (model_trainer) são importados apenas
+# pelos modos que os usam: o modo treino não carrega o classificador e nenhum
+# componente é criado antes da escolha do modo
 
 class HandRecognitionSystem:
-    def __init__(self):
+    def __init__(self, pipelined=False, feature_mode='hog', adaptive=False, max_interval=8,
+                 inference_width=None, show_metrics=False, model_type=None, packed=False,
+                 incremental=False, mode=None, auto_capture=False, capture_rate=2.0,
+                 class_quota=300):
         self.data_handler = DataHandler()
-        self.model_trainer = ModelTrainer()
-        self.detector = HandDetector()
+        self.feature_mode = feature_mode
+        self.model_type = model_type
+        self.packed = packed
+        self.incremental = incremental
+        self.adaptive = adaptive
+        self.max_interval = max_interval
+        self.inference_width = inference_width
+        self.mode = mode
         self.capture_manager = CaptureManager()
         
-        self.cap = cv2.VideoCapture(0)
+        # Criados em _setup_training/_setup_normal, conforme o modo
+        self.model_trainer = None
+        self.detector = None
+        self.tracker = None
+        self.background_trainer = None
+        self.cap = None
         self.model = None
         
-    def initialize(self):
-        # Perguntar modo de execução
-        print("\nSelecione o modo de execução:")
-        print("1 - Modo Normal (detecção e classificação)")
-        print("2 - Modo Treino Automático (gerar dataset com MediaPipe)")
+        # Tempo até o primeiro frame: duração de cada etapa e espera por entrada do usuário
+        self.startup_times = {}
+        self._input_wait = 0.0
+        self._first_frame_shown = False
+        self._camera_thread = None
         
-        mode = input("\nEscolha (1 ou 2): ")
+        # Buffers reaproveitados entre frames: leitura da câmera (modo sequencial) e exibição
+        self._camera_frame = None
+        self._display_frame = None
         
-        if mode == '2':
+        # Tempos por etapa sobre o vídeo (métricas precisam estar ativadas)
+        self.show_metrics = show_metrics
+        
+        # Captura automática no modo treino (tecla A liga/desliga)
+        self.auto_capture = None
+        self.auto_capture_options = {'enabled': auto_capture, 'rate': capture_rate,
+                                     'quota': class_quota}
+        
+        # Captura, inferência e exibição em threads separadas
+        self.pipelined = pipelined
+        self.pipeline = None
+        
+    def _ask(self, prompt):
+        """input() descontando a espera do tempo até o primeiro frame"""
+        start = time.perf_counter()
+        try:
+            return input(prompt)
+        finally:
+            self._input_wait += time.perf_counter() - start
+    
+    def _timed(self, step, fn):
+        start = time.perf_counter()
+        result = fn()
+        self.startup_times[step] = time.perf_counter() - start
+        return result
+    
+    def initialize(self):
+        mode = self.mode
+        if mode is None:
+            # Perguntar modo de execução
+            print("\nSelecione o modo de execução:")
+            print("1 - Modo Normal (detecção e classificação)")
+            print("2 - Modo Treino Automático (gerar dataset com MediaPipe)")
+            
+            mode = 'training' if self._ask("\nEscolha (1 ou 2): ") == '2' else 'normal'
+        
+        if mode == 'training':
             print("\n=== MODO TREINO AUTOMÁTICO ===")
             print("O MediaPipe detectará mãos e contará dedos automaticamente.")
             print("Pressione ESPAÇO para salvar as detecções atuais.")
             print("ESC para sair.")
-            return 'training'
         
-        # Modo normal
+        # A câmera aquece em paralelo com os imports e o carregamento do modelo
+        self._start_camera()
+        if mode == 'training':
+            self._setup_training()
+        else:
+            self._setup_normal()
+        self._wait_camera()
+        return mode
+    
+    def _start_camera(self):
+        def open_camera():
+            start = time.perf_counter()
+            self.cap = cv2.VideoCapture(0)
+            # Primeira leitura: inicializa o driver (costuma ser a mais lenta); o frame
+            # vira o buffer reaproveitado pelas leituras seguintes
+            ret, frame = self.cap.read()
+            if ret:
+                self._camera_frame = frame
+            self.startup_times['câmera'] = time.perf_counter() - start
+        
+        self._camera_thread = threading.Thread(target=open_camera, name='camera-warmup', daemon=True)
+        self._camera_thread.start()
+    
+    def _wait_camera(self):
+        if self._camera_thread:
+            self._camera_thread.join()
+            self._camera_thread = None
+    
+    def _create_detector(self):
+        # Modo adaptativo: MediaPipe a cada N frames, rastreamento nos intermediários.
+        # inference_width reduz apenas a entrada do MediaPipe; recortes e HOG usam o frame original
+        if self.adaptive:
+            from adaptive_detector import AdaptiveHandDetector
+            return AdaptiveHandDetector(max_interval=self.max_interval,
+                                        inference_width=self.inference_width)
+        from hand_detector import HandDetector
+        return HandDetector(inference_width=self.inference_width)
+    
+    def _setup_training(self):
+        """Modo treino: apenas o MediaPipe; o classificador não é carregado"""
+        from auto_capture import AutoCapture
+        
+        self.detector = self._timed('detector', self._create_detector)
+        options = dict(self.auto_capture_options)
+        enabled = options.pop('enabled')
+        self.auto_capture = AutoCapture(self.data_handler, **options)
+        self.auto_capture.enabled = enabled
+    
+    def _new_trainer(self):
+        from model_trainer import ModelTrainer, load_tuned_config
+        # Treinos usam a configuração do tune.py, se houver; modelos carregados usam a sua
+        return ModelTrainer(feature_mode=self.feature_mode, model_type=self.model_type,
+                            packed=self.packed, incremental=self.incremental,
+                            config=load_tuned_config(self.feature_mode))
+    
+    def _setup_normal(self):
+        """Modo normal: detector, trilhas, classificador e retreino em segundo plano"""
+        # Cada etapa cronometrada inclui os imports que ela dispara (sklearn, MediaPipe)
+        self.model_trainer = self._timed('classificador', self._new_trainer)
+        self.detector = self._timed('detector', self._create_detector)
+        
+        from hand_tracker import HandTracker
+        from background_trainer import BackgroundTrainer
+        
+        # Trilhas por mão: classificação em cache e contagem suavizada
+        self.tracker = HandTracker()
+        
+        # Retreino em segundo plano com troca do modelo ao final
+        self.background_trainer = BackgroundTrainer(
+            self.data_handler.dataset_path, self._swap_model, trainer_factory=self._new_trainer)
+        
         existing_count = self.data_handler.count_existing_images()
         
         # Tentar carregar modelo existente primeiro
-        if self.model_trainer.load_model():
+        if self._timed('modelo', self.model_trainer.load_model):
             print("Modelo existente carregado!")
             self.model = self.model_trainer
         
         if existing_count > 0:
             print(f"\nEncontradas {existing_count} imagens no dataset.")
-            response = input("Deseja treinar novo modelo com estas imagens? (s/n): ")
+            response = self._ask("Deseja treinar novo modelo com estas imagens? (s/n): ")
             
             if response.lower() == 's':
                 print("Treinando modelo...")
-                self.model = self.model_trainer.train(self.data_handler.dataset_path)
+                # Trainer novo: o carregado acima usa o HOG do modelo antigo
+                trained = self._new_trainer().train(self.data_handler.dataset_path)
+                if trained:
+                    self._swap_model(trained)
+                self.model = trained
                 if self.model:
                     print("Modelo treinado com sucesso!")
                 else:
                     print("Aviso: Modelo não pôde ser treinado. Continuando sem classificação de dedos.")
+    
+    def _report_first_frame(self, mode):
+        """Tempo do início do processo até o primeiro frame exibido, sem a espera por entrada"""
+        elapsed = time.perf_counter() - _START - self._input_wait
+        steps = ", ".join(f"{step} {seconds:.2f}s" for step, seconds in self.startup_times.items())
+        print(f"Primeiro frame (modo {mode}) em {elapsed:.2f}s [{steps}]")
+        metrics.record('primeiro_frame', elapsed)
+    
+    def _frames(self, process_fn):
+        """Gera (frame, resultado) em sequência ou pelo pipeline com threads"""
+        if not self.pipelined:
+            while True:
+                # O frame anterior já foi exibido/salvo: a leitura reaproveita seu buffer
+                with metrics.stage('camera'):
+                    ret, frame = self.cap.read(self._camera_frame)
+                if not ret:
+                    break
+                self._camera_frame = frame
+                with metrics.stage('inference'):
+                    result = process_fn(frame)
+                yield frame, result
+            return
+        
+        self.pipeline = FramePipeline(self.cap, process_fn).start()
+        try:
+            while True:
+                item = self.pipeline.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            self.pipeline.stop()
+            print(self.pipeline.stats.summary())
+            self.pipeline = None
+    
+    @staticmethod
+    def _match_landmarks(result, box, min_iou=0.3):
+        """Landmarks da mão detectada que mais se sobrepõe a uma caixa manual"""
+        from hand_detector import box_iou
+        best, best_iou = None, min_iou
+        for i, detected_box in enumerate(result.boxes):
+            iou = box_iou(box, detected_box)
+            if iou > best_iou:
+                best, best_iou = i, iou
+        if best is None:
+            return None, None
+        return result.points[best], result.handedness[best]
+    
+    def _detect_and_classify(self, frame):
+        """Uma passada do MediaPipe; as trilhas só reclassificam mãos que mudaram"""
+        result = self.detector.detect(frame)
+        model = self.model
+        classified = model is not None and model.model is not None
+        
+        detections = []
+        for track in self.tracker.update(result, model):
+            if not classified:
+                detections.append((track.box, -1, 0, track.id))
+            elif track.prediction is not None:
+                detections.append((track.box, track.fingers, track.confidence, track.id))
+        return result, detections
+    
+    def _swap_model(self, trainer):
+        """Substitui o modelo em uso pelo recém-treinado (atribuição atômica)"""
+        self.model_trainer = trainer
+        self.model = trainer
+    
+    def _draw_training_status(self, display_frame):
+        status = self.background_trainer.status()
+        if status:
+            cv2.putText(display_frame, status, (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 255), 2)
+    
+    def _draw_pipeline_stats(self, display_frame):
+        if self.pipeline:
+            cv2.putText(display_frame, self.pipeline.stats.summary(),
+                        (10, display_frame.shape[0] - 15),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+        
+        detector_stats = getattr(self.detector, 'stats', None)
+        if detector_stats:
+            text = f"N={self.detector.interval} | {detector_stats.summary()}"
+            cv2.putText(display_frame, text, (10, display_frame.shape[0] - 35),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+    
+    def _display_copy(self, frame):
+        """Cópia do frame para desenho, em um buffer reaproveitado
         
-        return 'normal'
+        O frame em si continua limpo: ESPAÇO o salva depois de exibido.
+        """
+        self._display_frame = copy_into(self._display_frame, frame)
+        return self._display_frame
+    
+    def _show(self, window, display_frame):
+        """Exibe o frame e retorna a tecla pressionada"""
+        if self.show_metrics:
+            metrics.draw_overlay(display_frame)
+        with metrics.stage('display'):
+            cv2.imshow(window, display_frame)
+            key = cv2.waitKey(1) & 0xFF
+        metrics.tick()
+        
+        if not self._first_frame_shown:
+            self._first_frame_shown = True
+            self._report_first_frame(self.mode)
+        return key
+    
+    def _draw_auto_capture(self, display_frame):
+        h = display_frame.shape[0]
+        cv2.putText(display_frame, self.auto_capture.stats.summary(), (10, h - 75),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        cv2.putText(display_frame, f"Cotas {self.auto_capture.quota_summary()}", (10, h - 55),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+    
+    def _draw_tracker_stats(self, display_frame):
+        cv2.putText(display_frame, self.tracker.summary(), (10, display_frame.shape[0] - 55),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
     
     def run_training_mode(self):
         """Modo de treino automático usando MediaPipe"""
         print("\n[MODO TREINO] Posicione suas mãos e pressione ESPAÇO para capturar")
         print("Dica: Mantenha a mão estável e bem iluminada para melhor detecção")
+        print("A liga/desliga a captura automática")
         saved_count = 0
+        auto_capture = self.auto_capture
         
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-            
-            display_frame = frame.copy()
+        # Detectar mãos e contar dedos com MediaPipe
+        for frame, detections in self._frames(self.detector.detect_hands_with_finger_count):
+            # Captura automática: taxa limitada, sem duplicatas e com cota por classe
+            saved_count += auto_capture.process(frame, detections)
+            if auto_capture.enabled and auto_capture.full():
+                auto_capture.enabled = False
+                print("Todas as cotas atingidas; captura automática desligada")
             
-            # Detectar mãos e contar dedos com MediaPipe
-            detections = self.detector.detect_hands_with_finger_count(frame)
+            display_frame = self._display_copy(frame)
             
             # Desenhar detecções
             for detection in detections:
@@ -92,23 +347,22 @@ class HandRecognitionSystem:
             # Instrução adicional
             cv2.putText(display_frame, "Mantenha os dedos bem separados e esticados", (10, 60), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+            if auto_capture.enabled:
+                self._draw_auto_capture(display_frame)
+            self._draw_pipeline_stats(display_frame)
             
-            cv2.imshow('Hand Recognition System - Training Mode', display_frame)
-            
-            key = cv2.waitKey(1) & 0xFF
+            key = self._show('Hand Recognition System - Training Mode', display_frame)
             
             if key == 27:  # ESC
                 break
+            elif key == ord('a') or key == ord('A'):
+                state = "ligada" if auto_capture.toggle() else "desligada"
+                print(f"Captura automática {state} ({auto_capture.quota_summary()})")
             elif key == 32:  # ESPAÇO
                 if detections:
-                    # Salvar todas as detecções
-                    for detection in detections:
-                        self.data_handler.save_training_image(
-                            frame,
-                            detection['box'],
-                            detection['fingers']
-                        )
-                        saved_count += 1
+                    # Salvar todas as detecções do frame de uma vez; a captura automática
+                    # passa a contá-las nas cotas e duplicatas
+                    saved_count += auto_capture.save_manual(frame, detections, source='mediapipe')
                     
                     print(f"Salvo! Total de imagens: {saved_count}")
                 else:
@@ -126,15 +380,15 @@ class HandRecognitionSystem:
                                 print("Digite um número entre 0 e 5")
                             except ValueError:
                                 print("Digite um número válido")
-                        
-                        self.data_handler.save_training_image(
-                            frame,
-                            detection['box'],
-                            detection['fingers']
-                        )
-                        saved_count += 1
+                    
+                    saved_count += auto_capture.save_manual(frame, detections,
+                                                            source='manual_correction')
                     print(f"Salvo com correções! Total: {saved_count}")
         
+        # Aguarda a gravação das capturas automáticas pendentes
+        auto_capture.close()
+        if auto_capture.stats.saved:
+            print(auto_capture.stats.summary())
         print(f"\nModo treino finalizado. {saved_count} imagens salvas.")
         print("Execute novamente no modo normal para treinar o modelo com estas imagens.")
     
@@ -145,56 +399,59 @@ class HandRecognitionSystem:
         print("ESC - Sair")
         print("-" * 40)
         
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-                
-            display_frame = frame.copy()
+        # Detectar e desenhar mãos; o modelo é lido a cada frame e o resultado
+        # do MediaPipe é reaproveitado pela captura manual
+        for frame, (result, detections) in self._frames(self._detect_and_classify):
+            display_frame = self._display_copy(frame)
             
-            # Detectar e desenhar mãos
-            detections = self.detector.detect_hands(frame, self.model)
-            for box, fingers, confidence in detections:
+            for box, fingers, confidence, track_id in detections:
                 x1, y1, x2, y2 = box
                 
                 # Cor baseada em se há classificação ou não
                 if fingers >= 0:
                     color = (0, 255, 0)  # Verde se classificado
-                    label = f"{fingers} dedos ({confidence:.1%})"
+                    label = f"#{track_id} {fingers} dedos ({confidence:.1%})"
                 else:
                     color = (255, 165, 0)  # Laranja se apenas detectado
-                    label = "Mão detectada"
+                    label = f"#{track_id} Mão detectada"
                 
                 cv2.rectangle(display_frame, (x1, y1), (x2, y2), color, 3)
                 cv2.putText(display_frame, label, (x1, y1-10), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
             
-            cv2.imshow('Hand Recognition System', display_frame)
-            
-            key = cv2.waitKey(1) & 0xFF
+            self._draw_training_status(display_frame)
+            self._draw_tracker_stats(display_frame)
+            self._draw_pipeline_stats(display_frame)
+            key = self._show('Hand Recognition System', display_frame)
             
             if key == 27:  # ESC
                 break
             elif key == 32:  # ESPAÇO
                 captured_data = self.capture_manager.capture_frame(frame)
                 if captured_data:
+                    # Landmarks da mão selecionada, para o classificador por landmarks
+                    landmarks, handedness = self._match_landmarks(result, captured_data['box'])
                     self.data_handler.save_training_image(
                         captured_data['image'],
                         captured_data['box'],
-                        captured_data['fingers']
+                        captured_data['fingers'],
+                        source='manual',
+                        landmarks=landmarks,
+                        handedness=handedness
                     )
                     print(f"Imagem salva: {captured_data['fingers']} dedos")
                     
                     # Retreinar com nova imagem
                     response = input("Deseja retreinar o modelo agora? (s/n): ")
                     if response.lower() == 's':
-                        print("Retreinando modelo...")
-                        self.model = self.model_trainer.train(self.data_handler.dataset_path)
-                        if self.model:
-                            print("Modelo atualizado!")
+                        # A detecção continua com o modelo atual durante o treino
+                        if self.background_trainer.start():
+                            print("Retreinando modelo em segundo plano...")
+                        else:
+                            print("Já existe um treino em andamento.")
     
     def run(self):
-        mode = self.initialize()
+        mode = self.mode = self.initialize()
         
         if mode == 'training':
             self.run_training_mode()
@@ -204,9 +461,62 @@ class HandRecognitionSystem:
         self.cleanup()
     
     def cleanup(self):
-        self.cap.release()
+        detector_stats = getattr(self.detector, 'stats', None)
+        if detector_stats:
+            print(detector_stats.summary())
+        if metrics.enabled:
+            print(metrics.summary())
+            metrics.close()
+        if self.cap is not None:
+            self.cap.release()
         cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    system = HandRecognitionSystem()
+    parser = argparse.ArgumentParser(description="Sistema de reconhecimento de mãos")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="captura, inferência e exibição em threads separadas")
+    parser.add_argument('--mode', choices=('normal', 'training'), default=None,
+                        help="modo de execução (padrão: perguntar)")
+    parser.add_argument('--features', choices=FEATURE_MODES, default='hog',
+                        help="features do classificador: recorte+HOG ou landmarks do MediaPipe")
+    parser.add_argument('--model', choices=MODEL_TYPES, default=None,
+                        help="classificador usado ao treinar (padrão: o do tune.py, ou svc); "
+                             "o modelo salvo define o usado na predição")
+    parser.add_argument('--packed', action='store_true',
+                        help="treina a partir do dataset compactado (ROIs em um único arquivo)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="treino em lotes (SGD + partial_fit); retreinos usam só as capturas novas")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="executa o MediaPipe a cada N frames e rastreia as mãos entre eles")
+    parser.add_argument('--max-interval', type=int, default=8,
+                        help="maior N do modo adaptativo")
+    parser.add_argument('--inference-width', type=int, default=None,
+                        help="largura máxima do frame enviado ao MediaPipe (ex.: 640)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="mede cada etapa do frame e mostra os tempos sobre o vídeo")
+    parser.add_argument('--metrics-file', default=None,
+                        help="grava as métricas em JSON periodicamente neste arquivo")
+    parser.add_argument('--auto-capture', action='store_true',
+                        help="modo treino: salva as mãos continuamente, sem duplicatas")
+    parser.add_argument('--capture-rate', type=float, default=2.0,
+                        help="frames salvos por segundo na captura automática")
+    parser.add_argument('--class-quota', type=int, default=300,
+                        help="amostras por número de dedos na captura automática (0 = sem cota)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="expõe as métricas no formato Prometheus em localhost:PORTA/metrics")
+    args = parser.parse_args()
+    
+    if args.metrics or args.metrics_file or args.metrics_port:
+        metrics.enable()
+        metrics.export_path = args.metrics_file
+        if args.metrics_port:
+            metrics.serve(args.metrics_port)
+    
+    system = HandRecognitionSystem(pipelined=args.pipeline, feature_mode=args.features,
+                                   adaptive=args.adaptive, max_interval=args.max_interval,
+                                   inference_width=args.inference_width,
+                                   show_metrics=args.metrics, model_type=args.model,
+                                   packed=args.packed, incremental=args.incremental,
+                                   mode=args.mode, auto_capture=args.auto_capture,
+                                   capture_rate=args.capture_rate, class_quota=args.class_quota)
     system.run()
\ No newline at end of file
@@ -0,0 +1,213 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+
+# Limites (segundos) dos buckets do histograma exportado
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.04, 0.08, 0.16, 0.32, 0.64)
+
+class _NullTimer:
+    """Timer usado com as métricas desativadas: não mede nada"""
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _StageTimer:
+    __slots__ = ('metrics', 'name', 'start')
+    
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class StageStats:
+    """Janela recente (percentis) e totais acumulados (histograma) de uma etapa"""
+    
+    def __init__(self, window):
+        self.recent = deque(maxlen=window)
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+    
+    def add(self, seconds):
+        self.recent.append(seconds)
+        self.bucket_counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+    
+    def summary(self):
+        values = np.array(self.recent) * 1000
+        return {
+            'count': self.count,
+            'mean_ms': float(values.mean()),
+            'p50_ms': float(np.median(values)),
+            'p95_ms': float(np.percentile(values, 95)),
+            'max_ms': float(values.max())
+        }
+
+class Metrics:
+    """Tempos por etapa do frame, FPS e exportação (arquivo JSON ou HTTP)
+    
+    Desativado, stage() devolve um timer vazio compartilhado e tick() retorna
+    imediatamente, então os ganchos podem ficar nos caminhos críticos.
+    """
+    
+    def __init__(self, enabled=False, window=300):
+        self.enabled = enabled
+        self.window = window
+        self.stages = {}
+        self.frame_times = deque(maxlen=window)
+        self.frames = 0
+        
+        self.export_path = None
+        self.export_interval = 5.0
+        self._last_export = 0.0
+        self._server = None
+        self._lock = threading.Lock()
+    
+    def enable(self, enabled=True):
+        self.enabled = enabled
+    
+    def stage(self, name):
+        """Context manager que mede o bloco como a etapa name"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+    
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats(self.window)
+            stats.add(seconds)
+    
+    def tick(self):
+        """Marca um frame exibido; também grava o arquivo de métricas periodicamente"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            self.frame_times.append(now)
+            self.frames += 1
+        
+        if self.export_path and now - self._last_export >= self.export_interval:
+            self._last_export = now
+            self.export_file(self.export_path)
+    
+    def fps(self):
+        with self._lock:
+            if len(self.frame_times) < 2:
+                return 0.0
+            return (len(self.frame_times) - 1) / (self.frame_times[-1] - self.frame_times[0])
+    
+    def snapshot(self):
+        fps = self.fps()
+        with self._lock:
+            stages = {name: stats.summary() for name, stats in self.stages.items()}
+            frames = self.frames
+        return {'timestamp': time.time(), 'frames': frames, 'fps': fps, 'stages': stages}
+    
+    def summary(self):
+        snapshot = self.snapshot()
+        lines = [f"FPS: {snapshot['fps']:.1f} ({snapshot['frames']} frames)"]
+        for name, stats in snapshot['stages'].items():
+            lines.append(f"  {name:<12} p50 {stats['p50_ms']:7.2f}ms | p95 {stats['p95_ms']:7.2f}ms"
+                         f" | máx {stats['max_ms']:7.2f}ms")
+        return "\n".join(lines)
+    
+    def draw_overlay(self, frame, origin=(10, 90)):
+        snapshot = self.snapshot()
+        x, y = origin
+        lines = [f"FPS {snapshot['fps']:.1f}"]
+        lines += [f"{name}: {stats['p50_ms']:.1f}ms (p95 {stats['p95_ms']:.1f})"
+                  for name, stats in snapshot['stages'].items()]
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (x, y + 20 * i),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+    
+    def export_file(self, path):
+        # Escrita atômica: leitores nunca veem um arquivo pela metade
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+    
+    def prometheus(self):
+        """Métricas no formato texto do Prometheus"""
+        lines = [
+            "# HELP hand_stage_seconds Duração de cada etapa do frame",
+            "# TYPE hand_stage_seconds histogram"
+        ]
+        with self._lock:
+            for name, stats in self.stages.items():
+                cumulative = 0
+                for bound, count in zip(BUCKETS, stats.bucket_counts):
+                    cumulative += count
+                    lines.append(f'hand_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'hand_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stats.count}')
+                lines.append(f'hand_stage_seconds_sum{{stage="{name}"}} {stats.total}')
+                lines.append(f'hand_stage_seconds_count{{stage="{name}"}} {stats.count}')
+            frames = self.frames
+        
+        lines += [
+            "# HELP hand_frames_total Frames exibidos",
+            "# TYPE hand_frames_total counter",
+            f"hand_frames_total {frames}",
+            "# HELP hand_fps FPS na janela recente",
+            "# TYPE hand_fps gauge",
+            f"hand_fps {self.fps()}"
+        ]
+        return "\n".join(lines) + "\n"
+    
+    def serve(self, port=9100, host='127.0.0.1'):
+        """Expõe /metrics em uma thread HTTP local"""
+        metrics = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+        print(f"Métricas em http://{host}:{port}/metrics")
+    
+    def close(self):
+        if self.export_path:
+            self.export_file(self.export_path)
+        if self._server:
+            self._server.shutdown()
+            self._server = None
+
+# Instância usada pelos ganchos de HandDetector, ModelTrainer e dos laços principais
+metrics = Metrics()
@@ -0,0 +1,73 @@
+import numpy as np
+
+# scikit-learn só é importado em build_model: quem precisa apenas das listas de
+# tipos (argparse de main.py, batch_process.py) não paga o import (~1s)
+
+# Features de entrada do classificador: HOG da ROI ou landmarks do MediaPipe
+FEATURE_MODES = ('hog', 'landmarks')
+
+# 'svc': RBF com probability=True (calibração interna em 5 folds, treino mais lento)
+# 'svc_fast': mesmo RBF, confiança pelo softmax do decision_function
+# 'linear': SVM linear; custo de predição independe do tamanho do dataset
+# 'nystroem': aproximação do kernel RBF + SVM linear
+# 'trees': ExtraTrees pequeno, com probabilidades próprias
+# 'sgd': regressão logística por SGD; aceita partial_fit (treino incremental)
+MODEL_TYPES = ('svc', 'svc_fast', 'linear', 'nystroem', 'trees', 'sgd')
+
+DEFAULT_PARAMS = {
+    'svc': {'C': 10, 'gamma': 'scale'},
+    'svc_fast': {'C': 10, 'gamma': 'scale'},
+    'linear': {'C': 0.1},
+    'nystroem': {'C': 1.0, 'gamma': None, 'n_components': 300},
+    'trees': {'n_estimators': 100, 'max_depth': None, 'min_samples_leaf': 1},
+    'sgd': {'alpha': 1e-4}
+}
+
+def build_model(model_type='svc', n_features=None, **params):
+    """Classificador não ajustado; params sobrescrevem DEFAULT_PARAMS do tipo"""
+    if model_type not in MODEL_TYPES:
+        raise ValueError(f"Tipo de modelo inválido: {model_type}")
+    params = {**DEFAULT_PARAMS[model_type], **params}
+    from sklearn.ensemble import ExtraTreesClassifier
+    from sklearn.kernel_approximation import Nystroem
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import make_pipeline
+    from sklearn.svm import SVC, LinearSVC
+    
+    if model_type == 'svc':
+        return SVC(kernel='rbf', probability=True, C=params['C'], gamma=params['gamma'])
+    if model_type == 'svc_fast':
+        return SVC(kernel='rbf', C=params['C'], gamma=params['gamma'])
+    if model_type == 'linear':
+        return LinearSVC(C=params['C'], dual='auto', max_iter=5000)
+    if model_type == 'nystroem':
+        # Features normalizadas têm variância 1: gamma='scale' equivale a 1/n_features
+        gamma = params['gamma'] or 1.0 / (n_features or 1)
+        return make_pipeline(
+            Nystroem(kernel='rbf', gamma=gamma, n_components=params['n_components'],
+                     random_state=42),
+            LinearSVC(C=params['C'], dual='auto', max_iter=5000)
+        )
+    if model_type == 'sgd':
+        return SGDClassifier(loss='log_loss', alpha=params['alpha'], random_state=42)
+    return ExtraTreesClassifier(n_estimators=params['n_estimators'],
+                                max_depth=params['max_depth'],
+                                min_samples_leaf=params['min_samples_leaf'],
+                                random_state=42)
+
+def class_scores(model, features_scaled):
+    """Probabilidade por classe (colunas na ordem de model.classes_)
+    
+    Modelos sem predict_proba usam o softmax do decision_function, que custa
+    uma única avaliação do modelo e dispensa a calibração do SVC.
+    """
+    if hasattr(model, 'predict_proba'):
+        return model.predict_proba(features_scaled)
+    
+    scores = model.decision_function(features_scaled)
+    if scores.ndim == 1:
+        # Duas classes: uma única margem, positiva para classes_[1]
+        scores = np.column_stack([-scores, scores])
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp_scores = np.exp(scores)
+    return exp_scores / exp_scores.sum(axis=1, keepdims=True)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Várias câmeras ou vídeos ao mesmo tempo, um processo por fluxo
+
+Cada fluxo roda em um processo próprio, com seu próprio MediaPipe Hands. O
+classificador é o artefato compacto (compact_model.py) carregado por
+memory-map: todos os processos leem as mesmas páginas, sem uma cópia por
+processo e sem importar o scikit-learn. Os resultados de todos os fluxos são
+reunidos em um único JSONL (uma linha por frame, com o índice do fluxo) e o
+FPS e a latência (captura até a gravação) de cada fluxo são impressos
+periodicamente.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+from collections import deque
+from pathlib import Path
+import cv2
+from metrics import metrics
+from model_backends import FEATURE_MODES
+
+def parse_source(text):
+    """Índice de câmera ('0', '1', ...) ou caminho/URL de vídeo"""
+    return int(text) if text.isdigit() else text
+
+def compact_model_path(feature_mode='hog'):
+    """Caminho do modelo compacto, exportado do modelo salvo se ainda não existir"""
+    suffix = "" if feature_mode == 'hog' else f"_{feature_mode}"
+    path = Path(f"hand_model{suffix}_compact")
+    if path.is_dir():
+        return path
+    
+    # Modelos salvos antes do artefato compacto: exporta uma vez aqui
+    from model_trainer import ModelTrainer
+    from compact_model import export_model
+    
+    trainer = ModelTrainer(feature_mode=feature_mode)
+    if not trainer.load_model():
+        return None
+    return export_model(trainer)
+
+class StreamStats:
+    """FPS e latência de um fluxo, na janela recente"""
+    
+    def __init__(self, source, window=120):
+        self.source = source
+        self.frames = 0
+        self.hands = 0
+        self.dropped = 0
+        self.finished = False
+        self.arrivals = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)
+    
+    def add(self, record, now):
+        self.frames += 1
+        self.hands += len(record['hands'])
+        self.arrivals.append(now)
+        self.latencies.append(now - record['timestamp'])
+    
+    def fps(self):
+        if len(self.arrivals) < 2:
+            return 0.0
+        return (len(self.arrivals) - 1) / (self.arrivals[-1] - self.arrivals[0])
+    
+    def latency_ms(self):
+        if not self.latencies:
+            return 0.0, 0.0
+        return 1000 * sum(self.latencies) / len(self.latencies), 1000 * max(self.latencies)
+    
+    def summary(self):
+        mean_ms, max_ms = self.latency_ms()
+        return (f"{self.source}: {self.fps():.1f} FPS | Latência: {mean_ms:.0f}ms "
+                f"(máx {max_ms:.0f}ms) | {self.frames} frames, {self.hands} mãos, "
+                f"{self.dropped} descartados")
+
+def stream_worker(stream_id, source, options, results, stop, core=None):
+    """Lê o fluxo, detecta e classifica cada frame e envia as linhas para o processo principal"""
+    # Ctrl+C é tratado pelo processo principal, que sinaliza stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Núcleo fixo (Linux) e threads do OpenCV divididas entre os fluxos
+    if core is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {core})
+    cv2.setNumThreads(options['cv_threads'])
+    
+    from batch_process import frame_record
+    from compact_model import CompactModel
+    if options['adaptive']:
+        from adaptive_detector import AdaptiveHandDetector
+        detector = AdaptiveHandDetector(inference_width=options['inference_width'])
+    else:
+        from hand_detector import HandDetector
+        detector = HandDetector(inference_width=options['inference_width'])
+    classifier = CompactModel.load(options['model_path']) if options['model_path'] else None
+    
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        results.put(('error', stream_id, f"Não foi possível abrir {source}"))
+        results.put(('done', stream_id, 0))
+        detector.hands.close()
+        return
+    
+    frame = None
+    frame_id = 0
+    dropped = 0
+    try:
+        while not stop.is_set():
+            # O frame anterior já foi classificado: a leitura reaproveita seu buffer
+            ret, frame = cap.read(frame)
+            if not ret:
+                break
+            captured_at = time.time()
+            record = frame_record(str(source), frame_id, detector.detect(frame), classifier)
+            record['stream'] = stream_id
+            record['timestamp'] = captured_at
+            frame_id += 1
+            
+            # Sem bloquear a câmera: se o processo principal atrasar, a linha é descartada
+            try:
+                results.put_nowait(('frame', stream_id, record))
+            except queue.Full:
+                dropped += 1
+    finally:
+        cap.release()
+        detector.hands.close()
+        results.put(('done', stream_id, dropped))
+
+def run_streams(sources, output='streams.jsonl', feature_mode='hog', inference_width=None,
+                adaptive=False, pin=False, stats_interval=5.0, duration=None):
+    model_path = compact_model_path(feature_mode)
+    if model_path is None:
+        print("Modelo não encontrado; apenas detecção e contagem por landmarks", file=sys.stderr)
+    
+    n_cores = os.cpu_count() or 1
+    if len(sources) > n_cores:
+        print(f"Aviso: {len(sources)} fluxos para {n_cores} núcleos", file=sys.stderr)
+    options = {
+        'model_path': str(model_path) if model_path else None,
+        'inference_width': inference_width,
+        'adaptive': adaptive,
+        'cv_threads': max(1, n_cores // len(sources))
+    }
+    
+    # 'spawn': cada processo cria seu próprio MediaPipe
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue(maxsize=64 * len(sources))
+    stop = context.Event()
+    processes = [
+        context.Process(target=stream_worker, name=f'stream-{stream_id}',
+                        args=(stream_id, source, options, results, stop,
+                              stream_id % n_cores if pin else None), daemon=True)
+        for stream_id, source in enumerate(sources)
+    ]
+    for process in processes:
+        process.start()
+    
+    # Ctrl+C encerra os fluxos, mas as linhas já enviadas ainda são gravadas
+    previous_handler = signal.signal(signal.SIGINT, lambda *args: stop.set())
+    stats = [StreamStats(f"[{stream_id}] {source}") for stream_id, source in enumerate(sources)]
+    start = time.perf_counter()
+    last_report = start
+    out = sys.stdout if output == '-' else open(output, 'w')
+    try:
+        while not all(stream.finished for stream in stats):
+            if duration and time.perf_counter() - start >= duration:
+                stop.set()
+            try:
+                message = results.get(timeout=0.5)
+            except queue.Empty:
+                # Processo encerrado sem avisar (ex.: erro no MediaPipe)
+                for stream, process in zip(stats, processes):
+                    if not process.is_alive() and process.exitcode:
+                        stream.finished = True
+                continue
+            
+            kind, stream_id, payload = message
+            if kind == 'frame':
+                record = payload
+                stats[stream_id].add(record, time.time())
+                out.write(json.dumps(record) + '\n')
+                metrics.record(f'stream_{stream_id}', time.time() - record['timestamp'])
+                metrics.tick()
+            elif kind == 'error':
+                print(payload, file=sys.stderr)
+            else:
+                stats[stream_id].dropped = payload
+                stats[stream_id].finished = True
+            
+            now = time.perf_counter()
+            if stats_interval and now - last_report >= stats_interval:
+                last_report = now
+                for stream in stats:
+                    print(stream.summary(), file=sys.stderr)
+    finally:
+        stop.set()
+        signal.signal(signal.SIGINT, previous_handler)
+        if out is not sys.stdout:
+            out.close()
+        for process in processes:
+            process.join(timeout=5)
+    
+    elapsed = time.perf_counter() - start
+    total = sum(stream.frames for stream in stats)
+    for stream in stats:
+        print(stream.summary(), file=sys.stderr)
+    print(f"\nTotal: {total} frames de {len(sources)} fluxos em {elapsed:.1f}s "
+          f"({total / elapsed:.1f} FPS agregados)", file=sys.stderr)
+    if output != '-':
+        print(f"Resultados salvos em {output}", file=sys.stderr)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa várias câmeras/vídeos em paralelo")
+    parser.add_argument('sources', nargs='+',
+                        help="índices de câmera (0, 1, ...) ou caminhos/URLs de vídeo")
+    parser.add_argument('-o', '--output', default='streams.jsonl',
+                        help="JSONL com os resultados de todos os fluxos ('-' para stdout)")
+    parser.add_argument('--features', choices=FEATURE_MODES, default='hog')
+    parser.add_argument('--inference-width', type=int, default=None,
+                        help="largura máxima do frame enviado ao MediaPipe")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="MediaPipe a cada N frames, rastreamento nos intermediários")
+    parser.add_argument('--pin', action='store_true',
+                        help="fixa cada fluxo em um núcleo (Linux)")
+    parser.add_argument('--stats-interval', type=float, default=5.0,
+                        help="segundos entre os relatórios de FPS/latência (0 desliga)")
+    parser.add_argument('--duration', type=float, default=None,
+                        help="encerra após N segundos (padrão: até os fluxos terminarem)")
+    parser.add_argument('--metrics-file', default=None,
+                        help="grava a latência de cada fluxo em JSON ao encerrar")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="expõe a latência de cada fluxo no formato Prometheus em localhost:PORTA/metrics")
+    args = parser.parse_args()
+    
+    if args.metrics_file or args.metrics_port:
+        metrics.enable()
+        metrics.export_path = args.metrics_file
+        if args.metrics_port:
+            metrics.serve(args.metrics_port)
+    
+    run_streams([parse_source(source) for source in args.sources], args.output, args.features,
+                args.inference_width, args.adaptive, args.pin, args.stats_interval, args.duration)
+    metrics.close()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import shutil
+from pathlib import Path
+import cv2
+import numpy as np
+from data_handler import DataHandler
+from feature_extraction import ROI_SIZE, extract_roi
+
+class PackedDataset:
+    """Dataset compactado: ROIs em tons de cinza de tamanho fixo em um único arquivo
+    
+    rois.u8 guarda as ROIs (já recortadas e redimensionadas como no HOG) uma após
+    a outra e index.bin o id no manifest, o rótulo e a caixa de cada uma. Ambos
+    só recebem dados no final: novas capturas são acrescentadas sem reescrever o
+    arquivo, e o treino lê as ROIs por memory-map, sem decodificar PNGs.
+    """
+    
+    VERSION = 1
+    INDEX_DTYPE = np.dtype([('sample_id', '<i8'), ('label', '<i2'),
+                            ('x1', '<i4'), ('y1', '<i4'), ('x2', '<i4'), ('y2', '<i4')])
+    
+    def __init__(self, path, roi_size=ROI_SIZE):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.roi_size = tuple(roi_size)
+        self.rois_path = self.path / "rois.u8"
+        self.index_path = self.path / "index.bin"
+        self.meta_path = self.path / "meta.json"
+        
+        # (altura, largura) de cada ROI; roi_size segue a convenção (largura, altura) do cv2
+        self.roi_shape = (self.roi_size[1], self.roi_size[0])
+        self._check_meta()
+    
+    def _check_meta(self):
+        meta = {'version': self.VERSION, 'roi_size': list(self.roi_size)}
+        if self.meta_path.exists():
+            with open(self.meta_path) as f:
+                stored = json.load(f)
+            if stored != meta:
+                raise ValueError(f"Dataset compactado em {self.path} usa outro formato "
+                                 f"({stored}); reconstrua com --rebuild")
+        else:
+            with open(self.meta_path, 'w') as f:
+                json.dump(meta, f)
+    
+    @property
+    def roi_bytes(self):
+        return self.roi_shape[0] * self.roi_shape[1]
+    
+    def __len__(self):
+        """Registros completos presentes nos dois arquivos"""
+        if not self.index_path.exists() or not self.rois_path.exists():
+            return 0
+        return min(self.index_path.stat().st_size // self.INDEX_DTYPE.itemsize,
+                   self.rois_path.stat().st_size // self.roi_bytes)
+    
+    @property
+    def shape(self):
+        return (len(self),) + self.roi_shape
+    
+    def index(self):
+        """Índice (id, rótulo, caixa) de todas as ROIs"""
+        if not len(self):
+            return np.empty(0, dtype=self.INDEX_DTYPE)
+        return np.fromfile(self.index_path, dtype=self.INDEX_DTYPE, count=len(self))
+    
+    def rois(self):
+        """Todas as ROIs por memory-map (n, altura, largura), sem copiar para a memória"""
+        if not len(self):
+            return np.empty(self.shape, dtype=np.uint8)
+        return np.memmap(self.rois_path, dtype=np.uint8, mode='r', shape=self.shape)
+    
+    def last_id(self):
+        index = self.index()
+        return int(index['sample_id'].max()) if len(index) else 0
+    
+    def append(self, rois, records):
+        """Acrescenta ROIs (n, altura, largura) e registros (id, rótulo, x1, y1, x2, y2)"""
+        if not len(records):
+            return
+        rois = np.ascontiguousarray(rois, dtype=np.uint8)
+        if rois.shape[1:] != self.roi_shape:
+            raise ValueError(f"ROIs com formato {rois.shape[1:]}, esperado {self.roi_shape}")
+        
+        self._truncate_partial()
+        # ROIs primeiro: um registro no índice sempre tem sua ROI gravada
+        for path, data in ((self.rois_path, rois.tobytes()),
+                           (self.index_path, np.array([tuple(record) for record in records],
+                                                      dtype=self.INDEX_DTYPE).tobytes())):
+            with open(path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _truncate_partial(self):
+        """Descarta sobras de uma escrita interrompida antes de acrescentar
+        
+        Registros incompletos no fim de rois.u8 ou de index.bin, ou presentes em só
+        um dos arquivos, desalinhariam tudo o que fosse acrescentado depois: os dois
+        arquivos são cortados no último registro completo comum.
+        """
+        n = len(self)
+        for path, size in ((self.rois_path, n * self.roi_bytes),
+                           (self.index_path, n * self.INDEX_DTYPE.itemsize)):
+            if path.exists() and path.stat().st_size != size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+    
+    def sync(self, data_handler, batch_size=256):
+        """Empacota as amostras do manifest ainda não incluídas; retorna quantas"""
+        samples = data_handler.list_samples_after(self.last_id())
+        added = 0
+        
+        for start in range(0, len(samples), batch_size):
+            rois = []
+            records = []
+            # Frames compartilhados por várias mãos são decodificados uma vez por lote
+            decoded = {}
+            for sample_id, img_path, label, box in samples[start:start + batch_size]:
+                if img_path not in decoded:
+                    decoded[img_path] = cv2.imread(str(img_path))
+                image = decoded[img_path]
+                if image is None:
+                    print(f"Erro ao ler {img_path}")
+                    continue
+                try:
+                    rois.append(extract_roi(image, box, self.roi_size))
+                except cv2.error as e:
+                    print(f"Erro ao recortar {img_path}: {e}")
+                    continue
+                records.append((sample_id, label, *box))
+            
+            if records:
+                self.append(np.stack(rois), records)
+                added += len(records)
+        
+        return added
+    
+    def load(self):
+        """(ROIs por memory-map, rótulos, caixas)"""
+        index = self.index()
+        boxes = np.column_stack([index['x1'], index['y1'], index['x2'], index['y2']])
+        return self.rois(), index['label'].astype(int), boxes
+
+def packed_path(dataset_path):
+    return Path(dataset_path) / "packed"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compacta o dataset em um único arquivo de ROIs")
+    parser.add_argument('dataset', nargs='?', default='./hand_dataset')
+    parser.add_argument('--rebuild', action='store_true',
+                        help="descarta o arquivo compactado e empacota tudo de novo")
+    args = parser.parse_args()
+    
+    data_handler = DataHandler(args.dataset)
+    if args.rebuild and packed_path(args.dataset).exists():
+        shutil.rmtree(packed_path(args.dataset))
+    pack = PackedDataset(packed_path(args.dataset))
+    
+    added = pack.sync(data_handler)
+    size_mb = pack.rois_path.stat().st_size / 1e6 if pack.rois_path.exists() else 0
+    print(f"{added} amostras novas empacotadas; total {len(pack)} ({size_mb:.1f} MB) em {pack.path}")
@@ -0,0 +1,189 @@
+import queue
+import threading
+import time
+from collections import deque
+from metrics import metrics
+
+class PipelineStats:
+    """Latência ponta a ponta (captura até exibição) e frames descartados"""
+    
+    def __init__(self, window=120):
+        self.latencies = deque(maxlen=window)
+        self.render_times = deque(maxlen=window)
+        self.captured = 0
+        self.processed = 0
+        self.rendered = 0
+        self.dropped_capture = 0
+        self.dropped_results = 0
+        self._lock = threading.Lock()
+    
+    def count(self, field, n=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+    
+    def record_render(self, capture_time):
+        now = time.perf_counter()
+        with self._lock:
+            self.rendered += 1
+            self.latencies.append(now - capture_time)
+            self.render_times.append(now)
+    
+    @property
+    def dropped(self):
+        return self.dropped_capture + self.dropped_results
+    
+    def latency_ms(self):
+        with self._lock:
+            if not self.latencies:
+                return 0.0, 0.0
+            values = list(self.latencies)
+        return 1000 * sum(values) / len(values), 1000 * max(values)
+    
+    def fps(self):
+        with self._lock:
+            if len(self.render_times) < 2:
+                return 0.0
+            return (len(self.render_times) - 1) / (self.render_times[-1] - self.render_times[0])
+    
+    def summary(self):
+        mean_ms, max_ms = self.latency_ms()
+        return (f"FPS: {self.fps():.1f} | Latência: {mean_ms:.0f}ms (máx {max_ms:.0f}ms) | "
+                f"Descartados: {self.dropped} ({self.dropped_capture} câmera, "
+                f"{self.dropped_results} exibição)")
+
+class FramePool:
+    """Buffers de frame devolvidos após o uso e reaproveitados pela leitura da câmera
+    
+    Um frame só volta ao pool quando é descartado por uma fila ou quando a
+    exibição pede o próximo, então nunca é sobrescrito enquanto ainda está em uso.
+    """
+    
+    def __init__(self, max_free=4):
+        self.max_free = max_free
+        self._free = []
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Buffer livre para cap.read(); None faz o OpenCV alocar um novo"""
+        with self._lock:
+            return self._free.pop() if self._free else None
+    
+    def release(self, frame):
+        if frame is None:
+            return
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(frame)
+
+class FramePipeline:
+    """Executa captura, inferência e exibição em estágios paralelos
+    
+    Uma thread lê a câmera e mantém apenas o frame mais recente, outra executa
+    process_fn sobre ele; a exibição (thread principal, exigido pelo cv2.imshow)
+    consome os resultados com get().
+    """
+    
+    def __init__(self, cap, process_fn, queue_size=2):
+        self.cap = cap
+        self.process_fn = process_fn
+        self.stats = PipelineStats()
+        
+        # Filas limitadas: frames antigos são descartados em vez de acumular atraso
+        self.frames = queue.Queue(maxsize=1)
+        self.results = queue.Queue(maxsize=queue_size)
+        
+        self._stop = threading.Event()
+        self._camera_done = threading.Event()
+        self._threads = []
+        
+        # Frames lidos em buffers reaproveitados; o último entregue por get()
+        # pertence à exibição até a chamada seguinte
+        self.pool = FramePool(max_free=queue_size + 2)
+        self._displayed = None
+    
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._read_camera, name='camera', daemon=True),
+            threading.Thread(target=self._run_inference, name='inference', daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+    
+    def _put_latest(self, q, item):
+        """Coloca item na fila descartando o mais antigo se cheia; retorna descartes
+        
+        O frame (primeiro elemento) de cada item descartado volta ao pool.
+        """
+        dropped = 0
+        while True:
+            try:
+                q.put_nowait(item)
+                return dropped
+            except queue.Full:
+                try:
+                    old = q.get_nowait()
+                    dropped += 1
+                    if old is not None:
+                        self.pool.release(old[0])
+                except queue.Empty:
+                    pass
+    
+    def _read_camera(self):
+        while not self._stop.is_set():
+            buffer = self.pool.acquire()
+            with metrics.stage('camera'):
+                ret, frame = self.cap.read(buffer)
+            if not ret:
+                break
+            self.stats.count('captured')
+            dropped = self._put_latest(self.frames, (frame, time.perf_counter()))
+            if dropped:
+                self.stats.count('dropped_capture', dropped)
+        self._camera_done.set()
+    
+    def _run_inference(self):
+        while not self._stop.is_set():
+            try:
+                frame, capture_time = self.frames.get(timeout=0.1)
+            except queue.Empty:
+                if self._camera_done.is_set():
+                    break
+                continue
+            
+            with metrics.stage('inference'):
+                result = self.process_fn(frame)
+            self.stats.count('processed')
+            dropped = self._put_latest(self.results, (frame, result, capture_time))
+            if dropped:
+                self.stats.count('dropped_results', dropped)
+        
+        # Sinaliza fim do fluxo para o estágio de exibição
+        self._put_latest(self.results, None)
+    
+    def get(self):
+        """Próximo (frame, resultado); None quando a câmera encerra ou o pipeline para
+        
+        O frame retornado anteriormente é devolvido ao pool nesta chamada.
+        """
+        self.pool.release(self._displayed)
+        self._displayed = None
+        while True:
+            try:
+                item = self.results.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return None
+                continue
+            
+            if item is None:
+                return None
+            frame, result, capture_time = item
+            self.stats.record_render(capture_time)
+            self._displayed = frame
+            return frame, result
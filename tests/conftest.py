@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+import cv2
+import numpy as np
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def make_dataset(path, n_samples=60, seed=0):
+    """Dataset sintético com 6 classes (círculos de tamanhos diferentes) e landmarks"""
+    from data_handler import DataHandler
+    rng = np.random.default_rng(seed)
+    data_handler = DataHandler(path)
+    for i in range(n_samples):
+        fingers = i % 6
+        image = rng.integers(0, 50, (240, 320, 3), dtype=np.uint8)
+        cv2.circle(image, (100 + fingers * 20, 120), 20 + fingers * 5, (255, 255, 255), -1)
+        landmarks = rng.normal(0, 10, (21, 3)) + [150 + 10 * fingers, 120, 0]
+        landmarks[0] = [150, 200, 0]
+        data_handler.save_training_image(image, (40, 40, 260, 220), fingers,
+                                         landmarks=landmarks, handedness='Right')
+    return data_handler
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Diretório de trabalho temporário: os modelos são salvos no diretório atual"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture(scope='session')
+def dataset_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('dataset')
+    make_dataset(path)
+    return path
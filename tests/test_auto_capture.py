@@ -0,0 +1,80 @@
+import threading
+import time
+import numpy as np
+from auto_capture import AutoCapture
+from data_handler import DataHandler
+
+def _hand(fingers, seed, x=100):
+    rng = np.random.default_rng(seed)
+    points = rng.normal(0, 15, (21, 3)) + [x + 40, 120, 0]
+    return {'fingers': fingers, 'points': points, 'handedness': 'Right',
+            'box': (x, 60, x + 80, 180)}
+
+def _frame(seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (240, 320, 3), dtype=np.uint8)
+
+def _capture(tmp_path, **options):
+    capture = AutoCapture(DataHandler(tmp_path), rate=0, **options)
+    capture.enabled = True
+    return capture
+
+def test_near_duplicate_hands_in_one_frame(tmp_path):
+    capture = _capture(tmp_path)
+    hand = _hand(2, seed=1)
+    twin = dict(hand, box=(200, 60, 280, 180), points=hand['points'] + [100, 0, 0])
+    
+    assert capture.process(_frame(), [hand, twin]) == 1
+    assert capture.stats.duplicates == 1
+    assert capture.counts[2] == 1
+    capture.close()
+    assert capture.data_handler.count_existing_images(2) == 1
+
+def test_quota_is_not_exceeded_within_a_frame(tmp_path):
+    capture = _capture(tmp_path, quota=1)
+    
+    assert capture.process(_frame(), [_hand(3, seed=1), _hand(3, seed=2, x=200)]) == 1
+    assert capture.stats.over_quota == 1
+    capture.close()
+    assert capture.data_handler.count_existing_images(3) == 1
+
+def test_full_queue_records_nothing(tmp_path):
+    capture = _capture(tmp_path, queue_size=1)
+    release = threading.Event()
+    save = capture.data_handler.save_training_frame
+    
+    def slow_save(*args, **kwargs):
+        release.wait()
+        return save(*args, **kwargs)
+    capture.data_handler.save_training_frame = slow_save
+    
+    assert capture.process(_frame(1), [_hand(1, seed=1)]) == 1
+    # O escritor pega o primeiro item e fica bloqueado; o segundo ocupa a fila
+    while not capture._queue.empty():
+        time.sleep(0.001)
+    assert capture.process(_frame(2), [_hand(1, seed=2)]) == 1
+    
+    assert capture.process(_frame(3), [_hand(1, seed=3)]) == 0
+    assert capture.stats.dropped == 1
+    assert capture.counts[1] == 2
+    assert capture.history[1].count == 2
+    
+    release.set()
+    capture.close()
+    assert capture.data_handler.count_existing_images(1) == 2
+
+def test_manual_saves_count_toward_quota_and_duplicates(tmp_path):
+    capture = _capture(tmp_path, quota=2)
+    hand = _hand(4, seed=1)
+    
+    assert capture.save_manual(_frame(1), [hand, _hand(4, seed=2, x=200)]) == 2
+    assert capture.counts[4] == 2
+    assert capture.history[4].count == 2
+    assert capture.data_handler.count_existing_images(4) == 2
+    
+    # A mesma mão capturada à mão não é salva de novo pela automática, e a cota já foi atingida
+    assert capture.process(_frame(1), [hand]) == 0
+    assert capture.stats.over_quota == 1
+    capture.quota = 3
+    assert capture.process(_frame(1), [hand]) == 0
+    assert capture.stats.duplicates == 1
+    capture.close()
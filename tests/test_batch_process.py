@@ -0,0 +1,50 @@
+import json
+import cv2
+import numpy as np
+from batch_process import collect_jobs, run_batch, _iter_frames
+
+def test_image_ids_are_relative_to_input_root(tmp_path):
+    image = np.zeros((32, 32, 3), dtype=np.uint8)
+    for subdir in ('a', 'b', 'b/c'):
+        (tmp_path / subdir).mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(tmp_path / subdir / 'frame.png'), image)
+    
+    jobs = collect_jobs([str(tmp_path)])
+    ids = [frame_id for job in jobs for frame_id, _ in _iter_frames(*job)]
+    assert ids == ['a/frame.png', 'b/c/frame.png', 'b/frame.png']
+
+def test_single_image_id_is_its_name(tmp_path):
+    path = tmp_path / 'foto.png'
+    cv2.imwrite(str(path), np.zeros((32, 32, 3), dtype=np.uint8))
+    
+    job, = collect_jobs([str(path)])
+    assert [frame_id for frame_id, _ in _iter_frames(*job)] == ['foto.png']
+
+def _video(path, n_frames=25):
+    """Vídeo em que o brilho do frame i é 10 * i"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for i in range(n_frames):
+        writer.write(np.full((48, 64, 3), 10 * i, dtype=np.uint8))
+    writer.release()
+
+def test_video_is_split_into_frame_ranges(tmp_path):
+    path = tmp_path / 'video.avi'
+    _video(path)
+    
+    jobs = collect_jobs([str(path)], video_chunk=10)
+    assert [frames for _, _, _, frames in jobs] == [(0, 10), (10, 20), (20, None)]
+    
+    frames = [(frame_id, frame.mean()) for job in jobs for frame_id, frame in _iter_frames(*job)]
+    assert [frame_id for frame_id, _ in frames] == list(range(25))
+    np.testing.assert_allclose([mean for _, mean in frames], np.arange(25) * 10, atol=2)
+
+def test_multi_chunk_video_is_written_in_order(workdir):
+    _video(workdir / 'video.avi')
+    cv2.imwrite(str(workdir / 'foto.png'), np.zeros((32, 32, 3), dtype=np.uint8))
+    output = workdir / 'results.jsonl'
+    
+    assert run_batch(['video.avi', 'foto.png'], output, n_jobs=2, video_chunk=4) == 26
+    with open(output) as f:
+        records = [json.loads(line) for line in f]
+    assert [(r['source'], r['frame']) for r in records] == (
+        [('video.avi', i) for i in range(25)] + [('.', 'foto.png')])
@@ -0,0 +1,54 @@
+import contextlib
+import io
+import cv2
+import numpy as np
+import pytest
+from compact_model import CompactModel
+from data_handler import DataHandler
+from model_backends import MODEL_TYPES
+from model_trainer import ModelTrainer
+
+CASES = [('hog', model_type) for model_type in MODEL_TYPES] + [
+    ('landmarks', 'svc'), ('landmarks', 'sgd'), ('landmarks', 'trees')]
+
+def _trained(feature_mode, model_type, dataset_path):
+    # Nystroem com menos componentes que amostras de treino, como em um dataset real
+    params = {'n_components': 30} if model_type == 'nystroem' else None
+    trainer = ModelTrainer(n_jobs=1, feature_mode=feature_mode, model_type=model_type,
+                           model_params=params)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert trainer.train(dataset_path)
+    return trainer
+
+def _hog_inputs(dataset_path):
+    """(imagem, caixas) de cada amostra: a caixa original e uma deslocada"""
+    for path, _, box in DataHandler(dataset_path).list_samples():
+        image = cv2.imread(str(path))
+        x1, y1, x2, y2 = box
+        yield image, [box, [x1 + 7, y1 - 5, x2 - 11, y2 + 3]], None, None
+
+def _landmark_inputs(dataset_path):
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    samples = DataHandler(dataset_path).list_landmark_samples()
+    for i in range(0, len(samples) - 1, 2):
+        (landmarks_a, handedness_a, _), (landmarks_b, _, _) = samples[i], samples[i + 1]
+        # A segunda mão como esquerda: exercita o espelhamento das features
+        yield image, [[0, 0, 1, 1]] * 2, [landmarks_a, landmarks_b], [handedness_a, 'Left']
+
+@pytest.mark.parametrize('feature_mode, model_type', CASES)
+def test_compact_model_matches_trainer(workdir, dataset_path, feature_mode, model_type):
+    trainer = _trained(feature_mode, model_type, dataset_path)
+    compact = CompactModel(trainer.compact_path)
+    assert compact.model_type == model_type
+    
+    inputs = _hog_inputs if feature_mode == 'hog' else _landmark_inputs
+    checked = 0
+    for image, boxes, landmarks, handedness in inputs(dataset_path):
+        expected = trainer.predict_batch(image, boxes, landmarks, handedness)
+        actual = compact.predict_batch(image, boxes, landmarks, handedness)
+        assert [label for label, _ in actual] == [label for label, _ in expected]
+        np.testing.assert_allclose([confidence for _, confidence in actual],
+                                   [confidence for _, confidence in expected],
+                                   rtol=0, atol=1e-9)
+        checked += len(boxes)
+    assert checked >= 60
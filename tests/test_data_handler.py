@@ -0,0 +1,84 @@
+import sqlite3
+import cv2
+import numpy as np
+import pytest
+from data_handler import DataHandler
+
+def _legacy_dataset(path):
+    """Dataset anterior ao manifest: caixa codificada no nome do arquivo"""
+    image = np.full((120, 100, 3), 128, dtype=np.uint8)
+    for fingers, name in [(2, "0001_10,20_60,90.png"), (2, "0002_5,5_50,50.png"),
+                          (4, "0001_0,0_30,40.png")]:
+        finger_dir = path / f"{fingers}_fingers"
+        finger_dir.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(finger_dir / name), image)
+
+def test_legacy_dataset_is_imported(tmp_path):
+    _legacy_dataset(tmp_path)
+    
+    handler = DataHandler(tmp_path)
+    samples = handler.list_samples()
+    assert [(path.name, label, box) for path, label, box in samples] == [
+        ("0001_10,20_60,90.png", 2, [10, 20, 60, 90]),
+        ("0002_5,5_50,50.png", 2, [5, 5, 50, 50]),
+        ("0001_0,0_30,40.png", 4, [0, 0, 30, 40]),
+    ]
+    assert handler.count_existing_images(2) == 2
+    assert handler.count_existing_images() == 3
+    assert handler._db.execute("PRAGMA user_version").fetchone()[0] == 3
+
+def test_legacy_import_runs_once(tmp_path):
+    _legacy_dataset(tmp_path)
+    DataHandler(tmp_path)._db.close()
+    
+    handler = DataHandler(tmp_path)
+    assert handler.count_existing_images() == 3
+    assert len(handler.list_samples()) == 3
+
+def test_version_1_manifest_is_migrated(tmp_path):
+    # Manifest criado antes das colunas de recorte e landmarks
+    tmp_path.mkdir(exist_ok=True)
+    db = sqlite3.connect(str(tmp_path / "manifest.db"))
+    db.execute("""
+        CREATE TABLE samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, label INTEGER NOT NULL, path TEXT NOT NULL,
+            x1 INTEGER NOT NULL, y1 INTEGER NOT NULL, x2 INTEGER NOT NULL, y2 INTEGER NOT NULL,
+            frame_id TEXT, frame_width INTEGER, frame_height INTEGER, source TEXT,
+            captured_at REAL)""")
+    db.execute("INSERT INTO samples (label, path, x1, y1, x2, y2) VALUES (1, '1_fingers/a.png', 1, 2, 3, 4)")
+    db.execute("PRAGMA user_version = 1")
+    db.commit()
+    db.close()
+    
+    handler = DataHandler(tmp_path)
+    assert [box for _, _, box in handler.list_samples()] == [[1, 2, 3, 4]]
+    
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    landmarks = np.zeros((21, 3))
+    handler.save_training_image(image, (10, 10, 50, 50), 3, landmarks=landmarks, handedness='Right')
+    assert len(handler.list_landmark_samples()) == 1
+
+def test_failed_save_removes_written_crops(tmp_path, monkeypatch):
+    handler = DataHandler(tmp_path)
+    frame = np.full((120, 160, 3), 128, dtype=np.uint8)
+    annotations = [((10, 10, 50, 50), 2), ((80, 20, 140, 90), 3)]
+    
+    # A segunda mão falha depois que o recorte da primeira já foi gravado
+    real_imwrite = cv2.imwrite
+    calls = []
+    def failing_imwrite(path, image):
+        calls.append(path)
+        return len(calls) == 1 and real_imwrite(path, image)
+    monkeypatch.setattr(cv2, 'imwrite', failing_imwrite)
+    
+    with pytest.raises(IOError):
+        handler.save_training_frame(frame, annotations)
+    monkeypatch.undo()
+    
+    assert len(calls) == 2
+    assert list(tmp_path.glob("*_fingers/*.png")) == []
+    assert handler.count_existing_images() == 0
+    
+    # Os ids liberados pelo rollback voltam a ser usados sem colisão
+    paths = handler.save_training_frame(frame, annotations)
+    assert sorted(tmp_path.glob("*_fingers/*.png")) == sorted(paths)
@@ -0,0 +1,102 @@
+import numpy as np
+from feature_cache import FeatureCache
+
+KEY_A = ('a.png', 1, (0, 0, 10, 10))
+KEY_B = ('b.png', 1, (0, 0, 10, 10))
+KEY_C = ('c.png', 1, (0, 0, 10, 10))
+
+def _filled_cache(path):
+    cache = FeatureCache(path, config={'roi': 64})
+    cache.put(KEY_A, np.ones(4))
+    cache.put(KEY_B, np.zeros(4))
+    assert cache.save()
+    return cache
+
+def test_save_skips_unchanged_cache(tmp_path):
+    path = tmp_path / 'features_cache'
+    _filled_cache(path)
+    mtime = path.joinpath('features.f32').stat().st_mtime_ns
+    
+    cache = FeatureCache(path, config={'roi': 64})
+    for key in list(cache.rows):
+        assert cache.get(key) is not None
+    assert not cache.save()
+    assert path.joinpath('features.f32').stat().st_mtime_ns == mtime
+
+def test_save_appends_only_new_features(tmp_path):
+    path = tmp_path / 'features_cache'
+    _filled_cache(path)
+    inode = path.joinpath('features.f32').stat().st_ino
+    
+    cache = FeatureCache(path, config={'roi': 64})
+    cache.get(KEY_A)
+    cache.get(KEY_B)
+    stored = cache.put(KEY_C, np.full(4, 0.1))
+    assert stored.dtype == np.float32
+    assert cache.save()
+    
+    # Mesmo arquivo, crescido de uma linha
+    features = path.joinpath('features.f32')
+    assert features.stat().st_ino == inode
+    assert features.stat().st_size == 3 * 4 * 4
+    
+    cache = FeatureCache(path, config={'roi': 64})
+    assert list(cache.rows) == [KEY_A, KEY_B, KEY_C]
+    assert cache.features.dtype == np.float32
+    np.testing.assert_array_equal(cache.get(KEY_C), stored)
+
+def test_config_change_invalidates_cache(tmp_path):
+    path = tmp_path / 'features_cache'
+    _filled_cache(path)
+    
+    cache = FeatureCache(path, config={'roi': 32})
+    assert cache.get(KEY_A) is None
+    cache.put(KEY_A, np.ones(8))
+    assert cache.save()
+    cache = FeatureCache(path, config={'roi': 32})
+    assert list(cache.rows) == [KEY_A]
+    assert cache.get(KEY_A).shape == (8,)
+
+def test_save_prunes_missing_samples(tmp_path):
+    path = tmp_path / 'features_cache'
+    _filled_cache(path)
+    
+    # Metade das linhas obsoletas ainda não justifica reescrever o cache
+    cache = FeatureCache(path, config={'roi': 64})
+    cache.get(KEY_A)
+    assert not cache.save()
+    
+    cache = FeatureCache(path, config={'roi': 64})
+    cache.get(KEY_A)
+    cache.put(KEY_C, np.ones(4))
+    cache.MAX_STALE = 0.25
+    assert cache.save()
+    assert list(FeatureCache(path, config={'roi': 64}).rows) == [KEY_A, KEY_C]
+
+def test_interrupted_append_is_discarded(tmp_path):
+    path = tmp_path / 'features_cache'
+    _filled_cache(path)
+    
+    # Linha de features incompleta e chave sem '\n', como após uma queda no meio da gravação
+    with open(path / 'features.f32', 'ab') as f:
+        f.write(b'\0' * 6)
+    with open(path / 'keys.jsonl', 'ab') as f:
+        f.write(b'["c.png", 1, [0')
+    
+    cache = FeatureCache(path, config={'roi': 64})
+    assert list(cache.rows) == [KEY_A, KEY_B]
+    cache.get(KEY_A)
+    cache.get(KEY_B)
+    cache.put(KEY_C, np.full(4, 2.0))
+    assert cache.save()
+    
+    cache = FeatureCache(path, config={'roi': 64})
+    assert list(cache.rows) == [KEY_A, KEY_B, KEY_C]
+    np.testing.assert_array_equal(cache.get(KEY_B), np.zeros(4))
+    np.testing.assert_array_equal(cache.get(KEY_C), np.full(4, 2.0))
+
+def test_legacy_pickle_cache_is_removed(tmp_path):
+    legacy = tmp_path / 'features_cache.pkl'
+    legacy.write_bytes(b'old')
+    FeatureCache(tmp_path / 'features_cache', config={'roi': 64})
+    assert not legacy.exists()
@@ -0,0 +1,87 @@
+import tracemalloc
+import numpy as np
+from main import HandRecognitionSystem
+from model_trainer import ModelTrainer
+from pipeline import FramePipeline
+
+SHAPE = (480, 640, 3)
+
+class FakeCamera:
+    """Como cv2.VideoCapture.read: escreve no array recebido se tiver o formato do frame"""
+    
+    def __init__(self, n_frames):
+        self.n_frames = n_frames
+        self.count = 0
+    
+    def read(self, image=None):
+        if self.count >= self.n_frames:
+            return False, image
+        if image is None or image.shape != SHAPE:
+            image = np.empty(SHAPE, dtype=np.uint8)
+        image[...] = self.count % 256
+        self.count += 1
+        return True, image
+    
+    def release(self):
+        pass
+
+def _system(n_frames, pipelined=False):
+    system = HandRecognitionSystem(pipelined, 'hog', False, 8, None, False, None, False, False)
+    system.cap = FakeCamera(n_frames)
+    return system
+
+def test_sequential_frames_reuse_camera_and_display_buffers(workdir):
+    system = _system(20)
+    cameras, displays = set(), set()
+    for i, (frame, result) in enumerate(system._frames(lambda frame: None)):
+        assert frame[0, 0, 0] == i
+        display = system._display_copy(frame)
+        assert np.array_equal(display, frame)
+        cameras.add(frame.ctypes.data)
+        displays.add(display.ctypes.data)
+    assert len(cameras) == 1
+    assert len(displays) == 1
+
+def test_sequential_frame_path_does_not_allocate_per_frame(workdir):
+    system = _system(60)
+    frames = system._frames(lambda frame: None)
+    # Primeiro frame: alocação dos buffers
+    system._display_copy(next(frames)[0])
+    
+    tracemalloc.start()
+    try:
+        for frame, _ in frames:
+            system._display_copy(frame)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < np.prod(SHAPE) // 10
+
+def test_pipeline_recycles_frames():
+    pipeline = FramePipeline(FakeCamera(200), lambda frame: None).start()
+    buffers = set()
+    try:
+        while True:
+            item = pipeline.get()
+            if item is None:
+                break
+            buffers.add(item[0].ctypes.data)
+    finally:
+        pipeline.stop()
+    # Filas + frame em exibição + frame sendo lido; nunca um buffer por frame
+    assert pipeline.stats.rendered > 0
+    assert len(buffers) <= pipeline.pool.max_free + 3
+
+def test_extract_features_reuses_roi_buffers():
+    trainer = ModelTrainer(n_jobs=1)
+    image = np.random.default_rng(0).integers(0, 255, SHAPE, dtype=np.uint8)
+    
+    first = trainer.extract_features(image, (10, 20, 200, 300))
+    buffers = {name: buffer.ctypes.data for name, buffer in trainer._roi_buffers.items()}
+    assert set(buffers) == {'resized', 'gray'}
+    
+    for box in [(0, 0, 50, 60), (100, 100, 400, 450), (10, 20, 200, 300)]:
+        features = trainer.extract_features(image, box)
+        assert {name: buffer.ctypes.data
+                for name, buffer in trainer._roi_buffers.items()} == buffers
+    np.testing.assert_array_equal(features, first)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from mediapipe.framework.formats import landmark_pb2
+from hand_detector import _LANDMARK_DTYPE, HandDetector
+
+def _attribute_array(multi_hand_landmarks):
+    """Leitura de referência, campo a campo"""
+    return np.array([[(p.x, p.y, p.z) for p in hand_landmarks.landmark]
+                     for hand_landmarks in multi_hand_landmarks])
+
+def _hand(rng, **extra):
+    """NormalizedLandmarkList como a solução Hands entrega: desserializada dos bytes do grafo"""
+    hand_landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in rng.uniform(-0.2, 1.2, size=(21, 3)).astype(np.float32):
+        hand_landmarks.landmark.add(x=x, y=y, z=z, **extra)
+    # Valores que o encoder poderia tratar de forma especial
+    hand_landmarks.landmark[0].z = 0.0
+    hand_landmarks.landmark[1].x = -0.0
+    
+    parsed = landmark_pb2.NormalizedLandmarkList()
+    parsed.ParseFromString(hand_landmarks.SerializeToString())
+    return parsed
+
+@pytest.mark.parametrize('n_hands', [1, 2])
+def test_landmarks_array_matches_attribute_access(n_hands):
+    rng = np.random.default_rng(n_hands)
+    multi_hand_landmarks = [_hand(rng) for _ in range(n_hands)]
+    # Layout fixo: é a leitura direta dos bytes que está sendo comparada
+    for hand_landmarks in multi_hand_landmarks:
+        assert hand_landmarks.ByteSize() == 21 * _LANDMARK_DTYPE.itemsize
+    
+    landmarks = HandDetector._landmarks_array(multi_hand_landmarks)
+    assert landmarks.shape == (n_hands, 21, 3)
+    np.testing.assert_array_equal(landmarks, _attribute_array(multi_hand_landmarks))
+
+def test_landmarks_array_with_extra_fields_falls_back():
+    # visibility/presence mudam o layout serializado: a leitura campo a campo assume
+    rng = np.random.default_rng(3)
+    multi_hand_landmarks = [_hand(rng, visibility=0.9, presence=0.8), _hand(rng)]
+    assert multi_hand_landmarks[0].ByteSize() != 21 * _LANDMARK_DTYPE.itemsize
+    
+    np.testing.assert_array_equal(HandDetector._landmarks_array(multi_hand_landmarks),
+                                  _attribute_array(multi_hand_landmarks))
@@ -0,0 +1,93 @@
+import contextlib
+import io
+import json
+import cv2
+from feature_extraction import HOG_PARAMS
+from model_trainer import ModelTrainer, config_path, load_tuned_config
+
+def _train(trainer, dataset_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return trainer.train(dataset_path)
+
+def _samples(dataset_path):
+    from data_handler import DataHandler
+    return DataHandler(dataset_path).list_samples()
+
+def test_tuned_config_is_not_read_implicitly(workdir):
+    config_path().write_text(json.dumps({
+        'model_type': 'svc_fast', 'model_params': {'C': 100},
+        'hog_params': {**HOG_PARAMS, 'orientations': 12}
+    }))
+    
+    trainer = ModelTrainer(n_jobs=1)
+    assert trainer.model_type == 'svc'
+    assert trainer.hog_params == HOG_PARAMS
+    
+    tuned = ModelTrainer(n_jobs=1, config=load_tuned_config())
+    assert tuned.model_type == 'svc_fast'
+    assert tuned.model_params == {'C': 100}
+    assert tuned.hog_params['orientations'] == 12
+
+def test_loaded_model_uses_its_own_hog(workdir, dataset_path):
+    hog_params = {**HOG_PARAMS, 'orientations': 12, 'pixels_per_cell': (16, 16)}
+    trainer = ModelTrainer(n_jobs=1, model_type='linear', config={'hog_params': hog_params})
+    assert _train(trainer, dataset_path)
+    
+    # Configuração ajustada depois do treino (tune.py --no-train) não afeta o modelo salvo
+    loaded = ModelTrainer(n_jobs=1, config={'hog_params': dict(HOG_PARAMS)})
+    assert loaded.load_model()
+    assert loaded.hog_params == hog_params
+    
+    path, label, box = _samples(dataset_path)[0]
+    image = cv2.imread(str(path))
+    assert loaded.predict_batch(image, [box]) == trainer.predict_batch(image, [box])
+    assert loaded.predict_batch(image, [box])[0][0] is not None
+
+def test_tune_writes_svc_when_svc_fast_wins(workdir, dataset_path):
+    from tune import tune
+    with contextlib.redirect_stdout(io.StringIO()):
+        config = tune(dataset_path, model_types=['svc_fast'], search_hog=False, n_folds=2, n_jobs=1)
+    assert config['model_type'] == 'svc'
+    assert load_tuned_config()['model_type'] == 'svc'
+    assert ModelTrainer(n_jobs=1, config=load_tuned_config()).model_type == 'svc'
+
+def test_incremental_model_has_its_own_files(workdir, tmp_path):
+    from conftest import make_dataset
+    data_handler = make_dataset(tmp_path / 'ds')
+    
+    full = ModelTrainer(n_jobs=1, model_type='linear')
+    incremental = ModelTrainer(n_jobs=1, incremental=True)
+    assert incremental.model_path != full.model_path
+    assert incremental.scaler_path != full.scaler_path
+    assert incremental.compact_path != full.compact_path
+    
+    assert _train(full, data_handler.dataset_path)
+    full_model = full.model_path.read_bytes()
+    assert _train(incremental, data_handler.dataset_path)
+    assert full.model_path.read_bytes() == full_model
+    
+    # Uma amostra nova (id 61) não é reservada: não há acurácia a mostrar
+    data_handler.save_training_image(cv2.imread(str(_samples(data_handler.dataset_path)[0][0])),
+                                     (40, 40, 260, 220), 1)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        updated = ModelTrainer(n_jobs=1, incremental=True).train(data_handler.dataset_path)
+    assert updated.last_report['updated']
+    assert updated.last_report['accuracy'] is None
+    assert 'nan' not in output.getvalue()
+
+def test_reported_latency_is_per_frame(workdir, dataset_path, monkeypatch):
+    import model_trainer
+    batch_sizes = []
+    real_class_scores = model_trainer.class_scores
+    def recording_class_scores(model, features_scaled):
+        batch_sizes.append(len(features_scaled))
+        return real_class_scores(model, features_scaled)
+    monkeypatch.setattr(model_trainer, 'class_scores', recording_class_scores)
+    
+    trainer = ModelTrainer(n_jobs=1, model_type='linear')
+    assert _train(trainer, dataset_path)
+    # Chamadas repetidas com as mãos de um frame, não um lote amortizado
+    assert len(batch_sizes) > 100
+    assert set(batch_sizes) == {ModelTrainer.FRAME_HANDS}
+    assert trainer.last_report['predict_ms'] > 0
@@ -0,0 +1,49 @@
+import numpy as np
+from packed_dataset import PackedDataset
+
+ROI_SIZE = (8, 4)
+
+def _append(pack, ids):
+    rois = np.stack([np.full((4, 8), sample_id, dtype=np.uint8) for sample_id in ids])
+    pack.append(rois, [(sample_id, sample_id % 6, 0, 0, 10, 10) for sample_id in ids])
+
+def _check(pack, ids):
+    assert len(pack) == len(ids)
+    assert pack.index()['sample_id'].tolist() == ids
+    assert [int(roi[0, 0]) for roi in pack.rois()] == ids
+    assert pack.index_path.stat().st_size == len(ids) * PackedDataset.INDEX_DTYPE.itemsize
+    assert pack.rois_path.stat().st_size == len(ids) * 32
+
+def test_partial_index_record_is_discarded(tmp_path):
+    pack = PackedDataset(tmp_path, ROI_SIZE)
+    _append(pack, [1, 2, 3])
+    
+    # Escrita interrompida no meio de um registro do índice (e da ROI correspondente)
+    with open(pack.index_path, 'ab') as f:
+        f.write(b'\x07' * 5)
+    with open(pack.rois_path, 'ab') as f:
+        f.write(b'\x07' * 32)
+    assert len(pack) == 3
+    
+    _append(pack, [4, 5])
+    _check(pack, [1, 2, 3, 4, 5])
+
+def test_partial_roi_is_discarded(tmp_path):
+    pack = PackedDataset(tmp_path, ROI_SIZE)
+    _append(pack, [1, 2])
+    with open(pack.rois_path, 'ab') as f:
+        f.write(b'\x07' * 10)
+    
+    _append(pack, [3])
+    _check(pack, [1, 2, 3])
+
+def test_index_record_without_roi_is_discarded(tmp_path):
+    pack = PackedDataset(tmp_path, ROI_SIZE)
+    _append(pack, [1, 2])
+    with open(pack.index_path, 'ab') as f:
+        f.write(np.array([(9, 3, 0, 0, 1, 1)], dtype=PackedDataset.INDEX_DTYPE).tobytes())
+    assert len(pack) == 2
+    assert pack.last_id() == 2
+    
+    _append(pack, [3])
+    _check(pack, [1, 2, 3])
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Busca de hiperparâmetros com validação cruzada sobre features em cache
+
+As features de cada configuração de HOG são extraídas uma única vez (e ficam no
+cache do dataset); todas as combinações de modelo são avaliadas sobre elas, em
+paralelo. A melhor configuração é gravada em hand_config*.json, usada pelos
+treinos do main.py e do próprio tune.py (ModelTrainer(config=load_tuned_config())).
+"""
+import argparse
+import json
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from feature_extraction import HOG_PARAMS
+from model_backends import build_model
+from model_trainer import ModelTrainer, config_path, load_tuned_config
+
+# 'svc' é avaliado como 'svc_fast': a acurácia é a mesma e a calibração só encarece a busca.
+# Se vencer, a configuração gravada é 'svc' (probabilidades calibradas na predição)
+MODEL_GRID = {
+    'svc_fast': {'C': [1, 10, 100], 'gamma': ['scale', 1e-4, 1e-3]},
+    'linear': {'C': [0.01, 0.1, 1]},
+    'nystroem': {'C': [0.1, 1, 10], 'n_components': [300]},
+    'trees': {'n_estimators': [100, 300], 'min_samples_leaf': [1, 2]},
+    'sgd': {'alpha': [1e-5, 1e-4, 1e-3]}
+}
+
+HOG_GRID = [
+    {'orientations': 9, 'pixels_per_cell': (8, 8)},
+    {'orientations': 12, 'pixels_per_cell': (8, 8)},
+    {'orientations': 9, 'pixels_per_cell': (16, 16)}
+]
+
+def fit_and_score(X, y, train_idx, test_idx, model_type, params):
+    """Acurácia de um candidato em um fold (scaler ajustado só no treino do fold)"""
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X[train_idx])
+    model = build_model(model_type, X.shape[1], **params)
+    model.fit(X_train, y[train_idx])
+    return model.score(scaler.transform(X[test_idx]), y[test_idx])
+
+def search(X, y, candidates, n_folds=5, n_jobs=-1):
+    """Média e desvio da acurácia em validação cruzada de cada (tipo, parâmetros)"""
+    # Classes pequenas limitam o número de folds estratificados
+    n_folds = max(2, min(n_folds, np.bincount(np.unique(y, return_inverse=True)[1]).min()))
+    splits = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42).split(X, y))
+    
+    # joblib compartilha X com os processos por memmap em vez de copiá-lo por tarefa
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(fit_and_score)(X, y, train_idx, test_idx, model_type, params)
+        for model_type, params in candidates
+        for train_idx, test_idx in splits
+    )
+    scores = np.array(scores).reshape(len(candidates), n_folds)
+    return [{'model_type': model_type, 'model_params': params,
+             'score': float(fold_scores.mean()), 'std': float(fold_scores.std())}
+            for (model_type, params), fold_scores in zip(candidates, scores)]
+
+def tune(dataset_path, feature_mode='hog', model_types=None, search_hog=True, n_folds=5,
+         n_jobs=-1, packed=False):
+    model_types = model_types or list(MODEL_GRID)
+    candidates = [(model_type, params) for model_type in model_types
+                  for params in ParameterGrid(MODEL_GRID[model_type])]
+    
+    # Landmarks não têm parâmetros de extração
+    hog_grid = [None]
+    if feature_mode == 'hog':
+        hog_grid = [{**HOG_PARAMS, **hog} for hog in HOG_GRID] if search_hog else [dict(HOG_PARAMS)]
+    
+    results = []
+    start = time.perf_counter()
+    for hog_params in hog_grid:
+        trainer = ModelTrainer(feature_mode=feature_mode, model_type='svc', packed=packed)
+        if hog_params is not None:
+            trainer.hog_params = hog_params
+            print(f"\nHOG: {hog_params}")
+        
+        dataset = trainer.dataset_features(dataset_path)
+        if dataset is None:
+            return None
+        X, y = dataset
+        
+        for result in search(X, y, candidates, n_folds, n_jobs):
+            result['hog_params'] = hog_params
+            results.append(result)
+            print(f"  {result['model_type']:<9} {result['model_params']}: "
+                  f"{result['score']:.2%} ± {result['std']:.2%}")
+    
+    best = max(results, key=lambda result: (result['score'], -result['std']))
+    print(f"\nBusca concluída em {time.perf_counter() - start:.1f}s "
+          f"({len(results)} combinações, {n_folds} folds)")
+    print(f"Melhor: {best['model_type']} {best['model_params']} HOG {best['hog_params']} "
+          f"-> {best['score']:.2%}")
+    
+    config = {
+        'model_type': 'svc' if best['model_type'] == 'svc_fast' else best['model_type'],
+        'model_params': best['model_params'],
+        'cv_score': best['score'],
+        'tuned_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'top': sorted(results, key=lambda result: -result['score'])[:10]
+    }
+    if best['hog_params'] is not None:
+        config['hog_params'] = best['hog_params']
+    
+    path = config_path(feature_mode)
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=2)
+    print(f"Configuração salva em {path}")
+    return config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ajuste de hiperparâmetros do classificador")
+    parser.add_argument('dataset', nargs='?', default='./hand_dataset')
+    parser.add_argument('--features', choices=ModelTrainer.FEATURE_MODES, default='hog')
+    parser.add_argument('--models', default=','.join(MODEL_GRID),
+                        help=f"tipos avaliados, separados por vírgula ({', '.join(MODEL_GRID)})")
+    parser.add_argument('--no-hog-search', action='store_true',
+                        help="mantém os parâmetros HOG padrão")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('-j', '--jobs', type=int, default=-1,
+                        help="processos (padrão: todos os núcleos)")
+    parser.add_argument('--packed', action='store_true',
+                        help="lê as ROIs do dataset compactado em vez dos PNGs")
+    parser.add_argument('--no-train', action='store_true',
+                        help="não treina o modelo final com a melhor configuração")
+    args = parser.parse_args()
+    
+    model_types = [model_type.strip() for model_type in args.models.split(',') if model_type.strip()]
+    unknown = set(model_types) - set(MODEL_GRID)
+    if unknown:
+        parser.error(f"tipos desconhecidos: {', '.join(sorted(unknown))}")
+    
+    config = tune(args.dataset, args.features, model_types, not args.no_hog_search,
+                  args.folds, args.jobs, args.packed)
+    
+    # O modelo salvo guarda o HOG com que foi treinado; com --no-train o modelo
+    # atual continua válido até o próximo treino
+    if config and not args.no_train:
+        print("\nTreinando modelo final com a melhor configuração...")
+        ModelTrainer(feature_mode=args.features, packed=args.packed,
+                     config=load_tuned_config(args.features)).train(args.dataset)